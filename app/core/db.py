@@ -3,12 +3,16 @@
 from __future__ import annotations
 
 import os
+import threading
 from contextlib import contextmanager
+from functools import lru_cache
 from typing import Generator, Optional
 
 from sqlalchemy import create_engine, text, event
 from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateIndex
 
 # -----------------------------------------------------------------------------
 # Configuration de la base
@@ -96,7 +100,10 @@ def get_session(*, readonly: bool = False) -> Generator:
 
     - readonly=False (par défaut): commit sur sortie si pas d'exception.
     - readonly=True: rollback forcé sur sortie (aucune écriture persistée).
+    Le schéma est créé ici au premier accès DB du process, quelle que soit la page ouverte
+    (aucun bootstrap nécessaire dans main.py).
     """
+    _ensure_schema()
     session = SessionLocal()
     try:
         yield session
@@ -114,9 +121,41 @@ def get_session(*, readonly: bool = False) -> Generator:
 # Outils init & santé
 # -----------------------------------------------------------------------------
 
+@lru_cache(maxsize=None)
+def _create_schema(metadata) -> None:
+    # Mémoïsé par metadata: la réflexion/CREATE IF NOT EXISTS ne tourne qu'une fois par process
+    metadata.create_all(bind=engine)
+    # create_all ne touche pas aux tables existantes: on ajoute les index manquants (migration légère).
+    # Pas de checkfirst: la réflexion SQLite ignore les index sur expression (LOWER(club)), qui seraient
+    # recréés à chaque process -> CREATE INDEX IF NOT EXISTS, "already exists" toléré (MySQL n'a pas IF NOT EXISTS).
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(CreateIndex(index, if_not_exists=not URL_LOWER.startswith("mysql")))
+            except DBAPIError as e:
+                msg = str(e.orig or e).lower()
+                if "already exists" not in msg and "duplicate" not in msg:
+                    raise
+
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+def _ensure_schema() -> None:
+    """Crée le schéma au premier accès DB du process (aucune page n'a besoin d'appeler init_db)."""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        from .models import Base  # import tardif: models est chargé après db
+        _create_schema(Base.metadata)
+        _schema_ready = True
+
 def init_db(Base) -> None:
     """Crée les tables si absentes (usage dev). En prod: préférer Alembic migrations."""
-    Base.metadata.create_all(bind=engine)
+    _create_schema(Base.metadata)
 
 def connection_info() -> str:
     try:
@@ -79,6 +79,9 @@ class Match(Base):
         Index("ix_match_season", "season_id"),
         Index("ix_match_home", "home_club"),
         Index("ix_match_away", "away_club"),
+        # Index fonctionnels: les stats filtrent sur LOWER(club) + saison
+        Index("ix_match_home_lower_season", func.lower(home_club), season_id),
+        Index("ix_match_away_lower_season", func.lower(away_club), season_id),
     )
 
     def __repr__(self) -> str:
@@ -5,7 +5,7 @@ from __future__ import annotations
 from typing import List, Dict, Optional, Any
 from datetime import date as _date
 
-from sqlalchemy import select, func, and_, or_, delete, update
+from sqlalchemy import select, func, and_, or_, delete, insert, update
 from sqlalchemy.orm import selectinload
 
 from core.db import get_session
@@ -40,7 +40,7 @@ def _match_to_dict(m: Match, with_children: bool = False) -> Dict[str, Any]:
     data = {
         "id": m.id,
         "season_id": m.season_id,
-        "date": m.date.isoformat() if hasattr(m.date, "isoformat") else str(m.date),
+        "date": m.date,  # datetime.date (colonne Date): évite un re-parsing côté UI
         "venue": m.venue,
         "home_club": m.home_club,
         "away_club": m.away_club,
@@ -135,6 +135,21 @@ def get_match(match_id: int, *, user_ctx: Optional[dict] = None) -> Optional[Dic
         m = s.execute(stmt).scalar_one_or_none()
         return _match_to_dict(m, with_children=True) if m else None
 
+def get_matches_bulk(match_ids: List[int], *, user_ctx: Optional[dict] = None) -> Dict[int, Dict]:
+    """Détails (quarts + stats) de plusieurs matchs en une seule requête. Clé = id du match."""
+    ids = [int(i) for i in (match_ids or [])]
+    if not ids:
+        return {}
+    with get_session() as s:
+        stmt = (
+            select(Match)
+            .options(selectinload(Match.quarters), selectinload(Match.player_stats))
+            .where(Match.id.in_(ids))
+        )
+        stmt = _apply_user_filter(stmt, user_ctx)
+        res = s.execute(stmt).scalars().all()
+        return {m.id: _match_to_dict(m, with_children=True) for m in res}
+
 def list_matches(limit: int = 50, *, user_ctx: Optional[dict] = None) -> List[Dict]:
     with get_session() as s:
         stmt = select(Match).order_by(Match.date.desc(), Match.id.desc()).limit(int(limit or 50))
@@ -479,22 +494,22 @@ def replace_player_stats_for_match(
         # purge anciennes stats
         s.execute(delete(PlayerStat).where(PlayerStat.match_id == match_id))
 
-        # insert des nouvelles + somme
-        total_points = 0
+        # insert des nouvelles (un seul executemany) + somme
+        payload: List[Dict[str, Any]] = []
         for r in stats_rows or []:
-            name = _safe_str((r.get("player_name") or "Inconnu"), 80) or "Inconnu"
             g = int(r.get("goals") or 0)
             b = int(r.get("behinds") or 0)
-            p = _recompute_points(g, b)
-            total_points += p
-            s.add(PlayerStat(
-                match_id=match_id,
-                player_id=r.get("player_id"),  # peut rester None si non géré
-                player_name=name,
-                goals=g,
-                behinds=b,
-                points=p,
-            ))
+            payload.append({
+                "match_id": match_id,
+                "player_id": r.get("player_id"),  # peut rester None si non géré
+                "player_name": _safe_str((r.get("player_name") or "Inconnu"), 80) or "Inconnu",
+                "goals": g,
+                "behinds": b,
+                "points": _recompute_points(g, b),
+            })
+        if payload:
+            s.execute(insert(PlayerStat), payload)
+        total_points = sum(row["points"] for row in payload)
 
         if recalc_match_totals_side in {"home", "away"}:
             if recalc_match_totals_side == "home":
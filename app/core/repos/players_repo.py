@@ -75,24 +75,33 @@ def upsert_players(names: List[str], *, user_ctx: Optional[dict] = None) -> int:
         if not club:
             return 0
 
-        inserted = 0
-        for name in clean:
-            name_norm = _safe_str(name, 80)
-            if not name_norm:
-                continue
-
-            existing = s.execute(
-                select(Player).where(Player.club == club, Player.name == name_norm)
-            ).scalar_one_or_none()
-            if existing is None:
-                s.add(Player(name=name_norm, club=club, active=1))
-                inserted += 1
-            else:
-                # S'il existe mais inactif, on peut le réactiver
-                if not bool(existing.active):
-                    existing.active = 1
+        # Noms normalisés et dédoublonnés (ordre conservé)
+        wanted = list(dict.fromkeys(n for n in (_safe_str(x, 80) for x in clean) if n))
+        if not wanted:
+            return 0
+
+        # Un seul SELECT pour connaître l'existant (nom -> actif)
+        existing = dict(
+            s.execute(
+                select(Player.name, Player.active).where(Player.club == club, Player.name.in_(wanted))
+            ).all()
+        )
+
+        # Réactivation groupée des joueurs existants mais inactifs
+        to_reactivate = [n for n, active in existing.items() if not bool(active)]
+        if to_reactivate:
+            s.execute(
+                update(Player)
+                .where(Player.club == club, Player.name.in_(to_reactivate))
+                .values(active=1)
+            )
+
+        # Insertion groupée des manquants (executemany en un seul aller-retour)
+        missing = [n for n in wanted if n not in existing]
+        if missing:
+            s.execute(insert(Player), [{"name": n, "club": club, "active": 1} for n in missing])
         s.commit()
-        return inserted
+        return len(missing)
 
 def list_players(*, user_ctx: Optional[dict] = None) -> List[Dict]:
     """Liste des joueurs ACTIFS du club de l'utilisateur (triés par nom)."""
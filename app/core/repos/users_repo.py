@@ -167,6 +167,27 @@ def set_password(email: str, new_raw_password: str, *, caller_ctx: Optional[dict
         s.commit()
         return True
 
+def change_own_password(
+    email: str, current_raw_password: str, new_raw_password: str, *, caller_ctx: Optional[dict] = None
+) -> Tuple[bool, Optional[str]]:
+    """
+    Changement de mot de passe avec vérification de l'actuel, en une seule session DB
+    (au lieu de verify_password_by_email + set_password). Retourne (ok, message d'erreur).
+    """
+    email_n = _norm_email(email)
+    pwd = _norm_password(new_raw_password)
+
+    with get_session() as s:
+        u = s.scalars(select(User).where(User.email == email_n)).first()
+        if not u or not (_is_admin_ctx(caller_ctx) or _is_self_ctx(caller_ctx, u)):
+            return False, "Droits insuffisants."
+        if not _verify_and_migrate_if_needed(u, str(current_raw_password or ""), u.password_hash, s):
+            return False, "Mot de passe actuel invalide."
+        u.password_hash = _hash_password(pwd)
+        s.add(u)
+        s.commit()
+        return True, None
+
 def update_user_team(email: str, team_name: Optional[str], *, caller_ctx: Optional[dict] = None) -> bool:
     """
     Un admin peut modifier l'équipe de n'importe qui.
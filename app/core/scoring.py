@@ -3,6 +3,7 @@
 from __future__ import annotations
 from typing import Iterable, List, Literal, Optional, Tuple, Dict, Any
 from dataclasses import dataclass
+from functools import lru_cache
 
 # ---------------- Base rules (AFL) ----------------
 
@@ -42,6 +43,29 @@ def sum_quarters_match(quarters: Iterable[Any]) -> Dict[str, Tuple[int, int, int
     away_q = [TeamQuarter(int(q.away_goals or 0), int(q.away_behinds or 0), int(q.away_points or 0)) for q in quarters]
     return {"home": sum_quarters_team(home_q), "away": sum_quarters_team(away_q)}
 
+# ---------------- Vue normalisée d'un match ----------------
+
+class _MatchView:
+    """
+    Vue légère d'un match, limitée aux totaux (lus et convertis une seule fois).
+    Les G/B cumulés restent None s'ils ne sont pas stockés sur l'objet source.
+    Les relations (quarts, joueurs) ne sont pas lues ici: seuls les appelants qui en ont besoin les chargent.
+    """
+    __slots__ = ("thp", "tap", "hg", "hb", "ag", "ab")
+
+    def __init__(self, match: Any) -> None:
+        self.thp = int(getattr(match, "total_home_points", 0) or 0)
+        self.tap = int(getattr(match, "total_away_points", 0) or 0)
+        self.hg = getattr(match, "total_home_goals", None)
+        self.hb = getattr(match, "total_home_behinds", None)
+        self.ag = getattr(match, "total_away_goals", None)
+        self.ab = getattr(match, "total_away_behinds", None)
+
+    @classmethod
+    def of(cls, match: Any) -> "_MatchView":
+        """Réutilise la vue si on en reçoit déjà une (appels imbriqués)."""
+        return match if isinstance(match, cls) else cls(match)
+
 # ---------------- Validation cohérence ----------------
 
 def _nonneg(*vals: int) -> bool:
@@ -77,23 +101,27 @@ def validate_match_consistency(match: Any) -> List[str]:
     """
     errs: List[str] = []
 
-    thp = int(getattr(match, "total_home_points", 0) or 0)
-    tap = int(getattr(match, "total_away_points", 0) or 0)
+    v = _MatchView.of(match)
+    thp, tap = v.thp, v.tap
     if not _nonneg(thp, tap):
         errs.append("Totaux match négatifs détectés.")
 
-    qs = list(getattr(match, "quarters", []) or [])
-    if qs:
-        for i, q in enumerate(qs, start=1):
-            errs.extend(validate_quarter(q, i))
-
-        sums = sum_quarters_match(qs)
-        _, _, hp = sums["home"]
-        _, _, ap = sums["away"]
-        if hp != thp:
-            errs.append(f"Somme quarts domicile ({hp}) ≠ total_home_points ({thp}).")
-        if ap != tap:
-            errs.append(f"Somme quarts extérieur ({ap}) ≠ total_away_points ({tap}).")
+    # Pas de copie: la séquence (liste ORM) est relue telle quelle
+    qs = getattr(match, "quarters", None)
+    if not qs:
+        return errs
+
+    # Somme des points accumulée dans la boucle de validation (pas de second passage sum_quarters_match)
+    hp = ap = 0
+    for i, q in enumerate(qs, start=1):
+        errs.extend(validate_quarter(q, i))
+        hp += int(q.home_points or 0)
+        ap += int(q.away_points or 0)
+
+    if hp != thp:
+        errs.append(f"Somme quarts domicile ({hp}) ≠ total_home_points ({thp}).")
+    if ap != tap:
+        errs.append(f"Somme quarts extérieur ({ap}) ≠ total_away_points ({tap}).")
     return errs
 
 def validate_players_vs_declared(match: Any, team_side: Literal["home", "away"]) -> List[str]:
@@ -102,15 +130,15 @@ def validate_players_vs_declared(match: Any, team_side: Literal["home", "away"])
     Évite toute dépendance à un nom de club (ex-'Toulouse').
     """
     errs: List[str] = []
-    rows = list(getattr(match, "player_stats", []) or [])
+    v = _MatchView.of(match)
 
     # On ne somme que les lignes "présentes" (nom non vide ou id)
     team_points = 0
-    for s in rows:
+    for s in getattr(match, "player_stats", None) or ():
         if (getattr(s, "player_name", None) or "").strip() or getattr(s, "player_id", None) is not None:
             team_points += int(getattr(s, "points", 0) or 0)
 
-    declared = int(getattr(match, "total_home_points" if team_side == "home" else "total_away_points", 0) or 0)
+    declared = v.thp if team_side == "home" else v.tap
     if team_points != declared:
         errs.append(f"Écart: somme points joueurs {team_points} ≠ score déclaré {declared} côté {team_side}.")
     return errs
@@ -120,52 +148,60 @@ def validate_players_vs_declared(match: Any, team_side: Literal["home", "away"])
 Result = Literal["home", "away", "draw"]
 
 def winner(match: Any) -> Result:
-    thp = int(getattr(match, "total_home_points", 0) or 0)
-    tap = int(getattr(match, "total_away_points", 0) or 0)
-    if thp > tap:
+    v = _MatchView.of(match)
+    if v.thp > v.tap:
         return "home"
-    if thp < tap:
+    if v.thp < v.tap:
         return "away"
     return "draw"
 
 def margin(match: Any) -> int:
-    thp = int(getattr(match, "total_home_points", 0) or 0)
-    tap = int(getattr(match, "total_away_points", 0) or 0)
-    return abs(thp - tap)
+    v = _MatchView.of(match)
+    return abs(v.thp - v.tap)
 
 # ---------------- Mises à jour ----------------
 
-def compute_totals_from_quarters(match: Any) -> None:
+def compute_totals_from_quarters(match: Any) -> Optional[Dict[str, int]]:
     """
     Recalcule in-place match.total_home_points et total_away_points
     depuis les quarts. Ne touche pas aux goals/behinds cumulés du match
     (qui ne sont pas toujours stockés).
+    Renvoie {"home": points, "away": points} (None sans quarts) pour que
+    l'appelant puisse signaler à la validation que les totaux en dérivent.
     """
-    qs = list(getattr(match, "quarters", []) or [])
+    qs = getattr(match, "quarters", None)
     if not qs:
-        return
-    sums = sum_quarters_match(qs)
-    match.total_home_points = sums["home"][2]
-    match.total_away_points = sums["away"][2]
+        return None
+    # Une passe sur les quarts, sans objet intermédiaire par quart
+    hp = ap = 0
+    for q in qs:
+        hp += int(q.home_points or 0)
+        ap += int(q.away_points or 0)
+    match.total_home_points = hp
+    match.total_away_points = ap
+    return {"home": hp, "away": ap}
 
 # ---------------- Aides d’affichage ----------------
 
-def scoreline_home_away(match: Any) -> Tuple[str, str]:
-    """
-    Affiche 'goals.behinds (points)' si on dispose des G/B cumulés;
-    sinon '(points)' côté home/away.
-    """
-    thp = int(getattr(match, "total_home_points", 0) or 0)
-    tap = int(getattr(match, "total_away_points", 0) or 0)
-
-    hg = getattr(match, "total_home_goals", None)
-    hb = getattr(match, "total_home_behinds", None)
-    ag = getattr(match, "total_away_goals", None)
-    ab = getattr(match, "total_away_behinds", None)
-
-    if all(v is not None for v in (hg, hb, ag, ab)):
+@lru_cache(maxsize=4096)
+def _scoreline_pair(thp: int, tap: int, hg: Any, hb: Any, ag: Any, ab: Any) -> Tuple[str, str]:
+    """Formatage mémorisé par totaux: un même score réaffiché (reruns, historique) n'est formaté qu'une fois."""
+    if hg is not None and hb is not None and ag is not None and ab is not None:
         return (
             format_scoreline(int(hg or 0), int(hb or 0), thp),
             format_scoreline(int(ag or 0), int(ab or 0), tap),
         )
     return (f"({thp})", f"({tap})")
+
+def scoreline_home_away(match: Any) -> Tuple[str, str]:
+    """
+    Affiche 'goals.behinds (points)' si on dispose des G/B cumulés;
+    sinon '(points)' côté home/away.
+    """
+    v = _MatchView.of(match)
+    key = (v.thp, v.tap, v.hg, v.hb, v.ag, v.ab)
+    try:
+        return _scoreline_pair(*key)
+    except TypeError:
+        # G/B non hachables (type exotique): formatage direct
+        return _scoreline_pair.__wrapped__(*key)
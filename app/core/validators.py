@@ -3,6 +3,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 from dataclasses import dataclass, field as dc_field
+from datetime import date as _date, datetime
 from typing import Any, Dict, Iterable, List, Literal, Optional, Sequence, Tuple
 from collections import Counter
 
@@ -142,16 +143,10 @@ def validate_date_and_season(match: Any) -> List[ValidationIssue]:
     d = getattr(match, "date", None)
     season = getattr(match, "season_id", None)
 
-    # Dates futures : on prévient ou on interdit
-    try:
-        from datetime import date as _date
-        if d and isinstance(d, (_date,)):
-            today = _date.today()
-            if d > today:
-                sev: Severity = "error" if DISALLOW_FUTURE_DATES else "warning"
-                issues.append(ValidationIssue("match.date.future", f"La date ({d}) est dans le futur.", sev, "date"))
-    except Exception:
-        pass
+    # Dates futures : on prévient ou on interdit (datetime exclu: non comparable à date)
+    if isinstance(d, _date) and not isinstance(d, datetime) and d > _date.today():
+        sev: Severity = "error" if DISALLOW_FUTURE_DATES else "warning"
+        issues.append(ValidationIssue("match.date.future", f"La date ({d}) est dans le futur.", sev, "date"))
 
     # Saison vs date (année)
     if WARN_IF_SEASON_MISMATCH_WITH_DATE and d and _non_empty_str(season):
@@ -176,42 +171,62 @@ def validate_date_and_season(match: Any) -> List[ValidationIssue]:
 # Validations sur quarts
 # =========================
 
+_QUARTER_FIELDS = ("home_goals", "home_behinds", "home_points", "away_goals", "away_behinds", "away_points")
+
 def validate_quarter_values(quarters: Iterable[Any]) -> List[ValidationIssue]:
+    return _scan_quarters(quarters)[0]
+
+
+def _scan_quarters(quarters: Iterable[Any]) -> Tuple[List[ValidationIssue], int, int, Optional[Exception]]:
+    """
+    Valeurs des quarts (types, formule, bornes) en une seule boucle, attributs lus une fois par quart.
+    Renvoie aussi les sommes de points (domicile, extérieur) et, si elles sont incalculables, l'exception
+    de conversion (celle qu'aurait levée sum_quarters_match), pour _quarters_vs_totals_issues.
+    """
     issues: List[ValidationIssue] = []
+    sum_hp = sum_ap = 0
+    # sum_quarters_match convertit tous les champs domicile (quart par quart) puis tous les extérieur:
+    # on garde la 1re erreur de chaque côté pour reproduire la même exception
+    home_exc: Optional[Exception] = None
+    away_exc: Optional[Exception] = None
     for idx, q in enumerate(quarters or [], start=1):
+        qn = getattr(q, "q", idx)
+        raw = (
+            getattr(q, "home_goals", None), getattr(q, "home_behinds", None), getattr(q, "home_points", None),
+            getattr(q, "away_goals", None), getattr(q, "away_behinds", None), getattr(q, "away_points", None),
+        )
         # Types & ≥0
-        fields = [
-            ("home_goals", getattr(q, "home_goals", None)),
-            ("home_behinds", getattr(q, "home_behinds", None)),
-            ("home_points", getattr(q, "home_points", None)),
-            ("away_goals", getattr(q, "away_goals", None)),
-            ("away_behinds", getattr(q, "away_behinds", None)),
-            ("away_points", getattr(q, "away_points", None)),
-        ]
-        for fname, val in fields:
+        for fname, val in zip(_QUARTER_FIELDS, raw):
             if not _is_non_negative_int(val):
                 issues.append(ValidationIssue(
                     "quarter.field.invalid",
-                    f"Q{getattr(q, 'q', idx)}: {fname} doit être un entier ≥ 0.",
+                    f"Q{qn}: {fname} doit être un entier ≥ 0.",
                     "error",
                     fname,
-                    {"value": val, "quarter": getattr(q, "q", idx)},
+                    {"value": val, "quarter": qn},
                 ))
+                # Valeur non convertible par int(): la somme des quarts n'est pas calculable
+                try:
+                    int(val or 0)
+                except Exception as ex:
+                    if fname.startswith("home_"):
+                        home_exc = home_exc or ex
+                    else:
+                        away_exc = away_exc or ex
 
         # Cohérence points = 6*goals + behinds
-        hg, hb, hp = _safe_int(getattr(q, "home_goals", 0)), _safe_int(getattr(q, "home_behinds", 0)), _safe_int(getattr(q, "home_points", 0))
-        ag, ab, ap = _safe_int(getattr(q, "away_goals", 0)), _safe_int(getattr(q, "away_behinds", 0)), _safe_int(getattr(q, "away_points", 0))
-        if hp != points_of(hg, hb):
+        hg, hb, hp, ag, ab, ap = (_safe_int(v, 0) for v in raw)
+        if hp != hg * 6 + hb:
             issues.append(ValidationIssue(
                 "quarter.home_points.formula",
-                f"Q{getattr(q,'q', idx)}: incohérence points domicile ({hp} ≠ 6*{hg}+{hb}).",
+                f"Q{qn}: incohérence points domicile ({hp} ≠ 6*{hg}+{hb}).",
                 "error",
                 "home_points",
             ))
-        if ap != points_of(ag, ab):
+        if ap != ag * 6 + ab:
             issues.append(ValidationIssue(
                 "quarter.away_points.formula",
-                f"Q{getattr(q,'q', idx)}: incohérence points extérieur ({ap} ≠ 6*{ag}+{ab}).",
+                f"Q{qn}: incohérence points extérieur ({ap} ≠ 6*{ag}+{ab}).",
                 "error",
                 "away_points",
             ))
@@ -220,22 +235,38 @@ def validate_quarter_values(quarters: Iterable[Any]) -> List[ValidationIssue]:
         if MAX_GOALS_PER_QUARTER is not None and (hg > MAX_GOALS_PER_QUARTER or ag > MAX_GOALS_PER_QUARTER):
             issues.append(ValidationIssue(
                 "quarter.goals.unusually_high",
-                f"Q{getattr(q,'q', idx)}: nombre de goals inhabituel (home={hg}, away={ag}).",
+                f"Q{qn}: nombre de goals inhabituel (home={hg}, away={ag}).",
                 "warning",
             ))
         if MAX_BEHINDS_PER_QUARTER is not None and (hb > MAX_BEHINDS_PER_QUARTER or ab > MAX_BEHINDS_PER_QUARTER):
             issues.append(ValidationIssue(
                 "quarter.behinds.unusually_high",
-                f"Q{getattr(q,'q', idx)}: nombre de behinds inhabituel (home={hb}, away={ab}).",
+                f"Q{qn}: nombre de behinds inhabituel (home={hb}, away={ab}).",
                 "warning",
             ))
         if MAX_POINTS_PER_QUARTER is not None and (hp > MAX_POINTS_PER_QUARTER or ap > MAX_POINTS_PER_QUARTER):
             issues.append(ValidationIssue(
                 "quarter.points.unusually_high",
-                f"Q{getattr(q,'q', idx)}: total de points inhabituel (home={hp}, away={ap}).",
+                f"Q{qn}: total de points inhabituel (home={hp}, away={ap}).",
                 "warning",
             ))
 
+        sum_hp += hp
+        sum_ap += ap
+
+    return issues, sum_hp, sum_ap, home_exc or away_exc
+
+
+def _quarters_vs_totals_issues(match: Any, sum_hp: int, sum_ap: int, sum_exc: Optional[Exception]) -> List[ValidationIssue]:
+    """Somme quarts == totaux match à partir des sommes de _scan_quarters (mêmes issues que validate_match_quarters_vs_totals)."""
+    issues: List[ValidationIssue] = []
+    if sum_exc is not None:
+        issues.append(ValidationIssue("match.quarters.sum_failed", f"Échec du calcul de la somme des quarts: {sum_exc}", "error"))
+    else:
+        if sum_hp != _safe_int(getattr(match, "total_home_points", 0)):
+            issues.append(ValidationIssue("match.totals.home_mismatch", f"Somme quarts domicile ({sum_hp}) ≠ total déclaré ({getattr(match,'total_home_points', None)}).", "error", "total_home_points"))
+        if sum_ap != _safe_int(getattr(match, "total_away_points", 0)):
+            issues.append(ValidationIssue("match.totals.away_mismatch", f"Somme quarts extérieur ({sum_ap}) ≠ total déclaré ({getattr(match,'total_away_points', None)}).", "error", "total_away_points"))
     return issues
 
 
@@ -295,42 +326,64 @@ def validate_match_quarters_vs_totals(match: Any) -> List[ValidationIssue]:
 
 def validate_player_rows(player_stats: Iterable[Any]) -> List[ValidationIssue]:
     """Contrôle des lignes joueur (types, ≥0, points=6*goals+behinds)."""
+    issues, _keys, _total = _scan_player_rows(player_stats)
+    return issues
+
+
+def _field(row: Any, name: str) -> Any:
+    return getattr(row, name, None) if hasattr(row, name) else (row.get(name) if isinstance(row, dict) else None)
+
+
+def _scan_player_rows(player_stats: Iterable[Any]) -> Tuple[List[ValidationIssue], List[str], int]:
+    """
+    Une passe sur les lignes joueur: issues de validate_player_rows, clés normalisées des noms
+    (doublons) et somme des points (comparaison au score déclaré).
+    """
     issues: List[ValidationIssue] = []
+    keys: List[str] = []
+    total_points = 0
 
     for i, ps in enumerate(player_stats or [], start=1):
-        name = getattr(ps, "player_name", None) if hasattr(ps, "player_name") else (ps.get("player_name") if isinstance(ps, dict) else None)
+        name = _field(ps, "player_name")
 
         if not _non_empty_str(name):
             issues.append(ValidationIssue("player.name.missing", f"Ligne {i}: nom de joueur manquant.", "warning", "player_name"))
+        key = (name or "").strip().lower() if isinstance(name, str) else ""
+        if key:
+            keys.append(key)
 
-        goals = getattr(ps, "goals", None) if hasattr(ps, "goals") else (ps.get("goals") if isinstance(ps, dict) else None)
-        behinds = getattr(ps, "behinds", None) if hasattr(ps, "behinds") else (ps.get("behinds") if isinstance(ps, dict) else None)
-        points = getattr(ps, "points", None) if hasattr(ps, "points") else (ps.get("points") if isinstance(ps, dict) else None)
+        goals = _field(ps, "goals")
+        behinds = _field(ps, "behinds")
+        points = _field(ps, "points")
 
         for fname, val in (("goals", goals), ("behinds", behinds), ("points", points)):
             if not _is_non_negative_int(val):
                 issues.append(ValidationIssue("player.field.invalid", f"Ligne {i}: {fname} doit être un entier ≥ 0.", "error", fname, {"value": val, "row": i}))
 
         g, b, p = _safe_int(goals, 0), _safe_int(behinds, 0), _safe_int(points, 0)
-        if p != points_of(g, b):
+        if p != g * 6 + b:
             issues.append(ValidationIssue("player.points.formula", f"Ligne {i}: incohérence points ({p} ≠ 6*{g}+{b}).", "error", "points"))
+        total_points += p
 
-    return issues
+    return issues, keys, total_points
 
 
 def validate_duplicate_players(player_stats: Iterable[Any]) -> List[ValidationIssue]:
     """Avertit en cas de doublons de noms (insensibles à la casse/espaces)."""
-    issues: List[ValidationIssue] = []
     keys: List[str] = []
     for ps in (player_stats or []):
-        name = getattr(ps, "player_name", None) if hasattr(ps, "player_name") else (ps.get("player_name") if isinstance(ps, dict) else None)
+        name = _field(ps, "player_name")
         key = (name or "").strip().lower()
         if key:
             keys.append(key)
+    return _duplicate_issues(keys)
+
+
+def _duplicate_issues(keys: Iterable[str]) -> List[ValidationIssue]:
     dup_names = [n for n, c in Counter(keys).items() if c > 1]
     if dup_names:
-        issues.append(ValidationIssue("players.duplicates", f"Noms de joueurs en doublon: {', '.join(sorted(dup_names))}.", "warning", "player_name"))
-    return issues
+        return [ValidationIssue("players.duplicates", f"Noms de joueurs en doublon: {', '.join(sorted(dup_names))}.", "warning", "player_name")]
+    return []
 
 
 def validate_players_vs_declared(match: Any, *, team_side: Optional[Literal["home", "away"]] = None, team_name: Optional[str] = None) -> List[ValidationIssue]:
@@ -338,15 +391,18 @@ def validate_players_vs_declared(match: Any, *, team_side: Optional[Literal["hom
     Compare la somme des points joueurs au score déclaré (home/away).
     Spécifiez soit team_side ('home'/'away'), soit team_name.
     """
-    issues: List[ValidationIssue] = []
     pstats = list(getattr(match, "player_stats", []) or [])
     if not pstats:
-        return issues
+        return []
 
     total_players = 0
     for ps in pstats:
-        total_players += _safe_int(getattr(ps, "points", None) if hasattr(ps, "points") else (ps.get("points") if isinstance(ps, dict) else 0), 0)
+        total_players += _safe_int(_field(ps, "points"), 0)
+    return _declared_issues(match, total_players, team_side=team_side, team_name=team_name)
+
 
+def _declared_issues(match: Any, total_players: int, *, team_side: Optional[Literal["home", "away"]] = None, team_name: Optional[str] = None) -> List[ValidationIssue]:
+    issues: List[ValidationIssue] = []
     declared = _declared_points(match, team_side=team_side, team_name=team_name)
     if declared is None:
         # Pas assez de contexte pour comparer : warning informatif
@@ -380,11 +436,14 @@ def validate_match(
     *,
     team_side: Optional[Literal["home", "away"]] = None,
     team_name: Optional[str] = None,
+    precomputed: Optional[Dict[str, int]] = None,
 ) -> Tuple[bool, List[ValidationIssue], List[ValidationIssue]]:
     """
     Valide un objet Match complet.
     Retourne: (ok, errors, warnings)
     - Fournissez team_side OU team_name pour comparer les points joueurs au score déclaré.
+    - precomputed: résultat de compute_totals_from_quarters sur ce match; les totaux venant
+      d'être dérivés des quarts, la comparaison somme des quarts vs totaux est sautée.
     """
     errors: List[ValidationIssue] = []
     warnings: List[ValidationIssue] = []
@@ -398,28 +457,27 @@ def validate_match(
     _split_issues(issues, errors, warnings)
 
     # 3) Quarts (valeurs + séquence + somme vs totaux)
+    # Une seule passe sur les quarts (valeurs + sommes); ordre des issues: valeurs, séquence, somme vs totaux
     quarters = list(getattr(match, "quarters", []) or [])
     if quarters:
-        issues = validate_quarter_values(quarters)
+        issues, sum_hp, sum_ap, sum_exc = _scan_quarters(quarters)
         _split_issues(issues, errors, warnings)
 
         issues = validate_quarter_sequence(quarters)
         _split_issues(issues, errors, warnings)
 
-        issues = validate_match_quarters_vs_totals(match)
-        _split_issues(issues, errors, warnings)
+        if precomputed is None:
+            issues = _quarters_vs_totals_issues(match, sum_hp, sum_ap, sum_exc)
+            _split_issues(issues, errors, warnings)
 
     # 4) Joueurs
+    # Lignes, doublons et somme vs score déclaré à partir d'une seule passe sur les joueurs
     pstats = list(getattr(match, "player_stats", []) or [])
     if pstats:
-        issues = validate_player_rows(pstats)
-        _split_issues(issues, errors, warnings)
-
-        issues = validate_duplicate_players(pstats)
-        _split_issues(issues, errors, warnings)
-
-        issues = validate_players_vs_declared(match, team_side=team_side, team_name=team_name)
+        issues, keys, total_players = _scan_player_rows(pstats)
         _split_issues(issues, errors, warnings)
+        _split_issues(_duplicate_issues(keys), errors, warnings)
+        _split_issues(_declared_issues(match, total_players, team_side=team_side, team_name=team_name), errors, warnings)
 
     ok = len(errors) == 0
     return ok, errors, warnings
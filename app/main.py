@@ -20,6 +20,6 @@ if not u:
         # Fallback : on reste sur main et on affiche le lien + contenu d’accueil
         pass
 
-# Sidebar + entête d’accueil
-sidebar_menu()
+# Sidebar + entête d’accueil (utilisateur déjà résolu ci-dessus pour ce run)
+sidebar_menu(u)
 landing_content(u)
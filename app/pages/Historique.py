@@ -4,13 +4,14 @@ from __future__ import annotations
 import streamlit as st
 from types import SimpleNamespace as _NS
 from datetime import date as _date
+import numpy as np
 import pandas as pd
 
-from services.auth_service import require_login, current_user
+from services.auth_service import require_login, auth_context, new_csrf_token
 from core.repos.matches_repo import (
     list_matches,
     list_matches_for_team,
-    get_match,
+    get_matches_bulk,
     update_match_fields,
     replace_player_stats_for_match,
 )
@@ -26,42 +27,47 @@ st.title("📚 Historique des matchs")
 
 u = sidebar_menu()
 
-def _auth_ctx() -> dict:
-    u = current_user() or {}
-    return {
-        "id": u.get("id"),
-        "email": u.get("email"),
-        "team_name": (u.get("team_name") or "").strip(),
-        "is_admin": bool(u.get("is_admin")),
-    }
-
 # --- CSRF helpers (invisibles) ---
 def _ensure_csrf():
     if "csrf_token" not in st.session_state:
-        import secrets
-        st.session_state["csrf_token"] = secrets.token_urlsafe(24)
+        st.session_state["csrf_token"] = new_csrf_token()
     return st.session_state["csrf_token"]
 
 def _check_csrf() -> bool:
     # on vérifie juste la présence du token de session (pas d'input rendu)
     return bool(st.session_state.get("csrf_token"))
 
+# --- Lectures mises en cache (évite les allers-retours DB à chaque rerun) ---
+@st.cache_data(ttl=60, max_entries=64, show_spinner=False)
+def _cached_list_matches(team: str, limit: int, uid, is_admin: bool) -> list[dict]:
+    ctx = {"id": uid, "team_name": team, "is_admin": is_admin}
+    if team and not is_admin:
+        return list_matches_for_team(team, limit, user_ctx=ctx)
+    return list_matches(limit, user_ctx=ctx)
+
+@st.cache_data(ttl=60, max_entries=512, show_spinner=False)
+def _cached_get_matches_bulk(match_ids: tuple[int, ...], uid, team: str, is_admin: bool) -> dict[int, dict]:
+    return get_matches_bulk(list(match_ids), user_ctx={"id": uid, "team_name": team, "is_admin": is_admin})
+
+def _invalidate_match_cache() -> None:
+    _cached_list_matches.clear()
+    _cached_get_matches_bulk.clear()
+
 user = require_login()
-caller = _auth_ctx()
-csrf = _ensure_csrf()
+caller = auth_context()
+_ensure_csrf()
 
 team = caller["team_name"]
 
 # ---------------------------
 # Liste des matchs (filtrée)
 # ---------------------------
+rows = _cached_list_matches(team, 100, caller["id"], caller["is_admin"])
 if team and not caller["is_admin"]:
-    rows = list_matches_for_team(team, 100, user_ctx=caller)
     st.caption(f"Filtrage par équipe : **{team}**")
     key_prefix_main = "hist-main-team"
 else:
     # Admin : listing global (toujours avec user_ctx)
-    rows = list_matches(100, user_ctx=caller)
     st.caption("Affichage global.")
     key_prefix_main = "hist-main-all"
 
@@ -72,27 +78,59 @@ if not rows:
     st.stop()
 
 # ---- Vue synthétique : tableau ----
-match_objs = [_NS(**m) for m in rows]
 matches_table(
-    match_objs,
+    pd.DataFrame(rows),
     title="📜 Récapitulatif des matchs",
     show_download=True,
     key_prefix=key_prefix_main,
+    static=True,
 )
 
 # ---------------------------
 # Détail par match
 # ---------------------------
-for m in rows:
+def _open_key(match_id: int) -> str:
+    return f"open-{match_id}"
+
+# Pagination des détails: seuls les matchs de la page courante sont rendus
+PAGE_SIZE = 10
+PAGE_KEY = "hist_page"
+
+def _goto_page(p: int) -> None:
+    st.session_state[PAGE_KEY] = p
+
+n_pages = max(1, -(-len(rows) // PAGE_SIZE))
+page = min(max(int(st.session_state.get(PAGE_KEY, 0)), 0), n_pages - 1)
+visible = rows[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+
+if n_pages > 1:
+    p1, p2, p3 = st.columns([1, 2, 1])
+    p1.button("◀️ Précédent", key="hist-prev", disabled=page == 0, on_click=_goto_page, args=(page - 1,))
+    p2.caption(f"Page {page + 1}/{n_pages} — {len(rows)} matchs")
+    p3.button("Suivant ▶️", key="hist-next", disabled=page >= n_pages - 1, on_click=_goto_page, args=(page + 1,))
+
+# Détails chargés uniquement pour les matchs ouverts, en un seul aller-retour DB
+opened_ids = tuple(m["id"] for m in visible if st.session_state.get(_open_key(m["id"])))
+details = _cached_get_matches_bulk(opened_ids, caller["id"], team, caller["is_admin"]) if opened_ids else {}
+
+@st.fragment
+def _render_match(m: dict, detail: dict | None, caller: dict, team: str) -> None:
+    """Rendu d'un match: les interactions internes ne relancent que ce fragment."""
     header = f"{m['date']} — {m['home_club']} {m['total_home_points']} – {m['total_away_points']} {m['away_club']}"
-    with st.expander(header, expanded=False):
+    is_open = bool(st.session_state.get(_open_key(m["id"])))
+    with st.expander(header, expanded=is_open):
         st.caption(f"Saison {m['season_id']} • Lieu : {m.get('venue') or '—'} • ID: {m['id']}")
 
-        # Détail (quarts + stats) — protégé par user_ctx
-        detail = get_match(m["id"], user_ctx=caller)
+        if not st.toggle("🔎 Charger les détails", key=_open_key(m["id"])):
+            return
+
+        # Détail (quarts + stats) — protégé par user_ctx.
+        # Si le toggle vient d'être activé, seul ce fragment a été relancé: chargement unitaire.
+        if detail is None:
+            detail = _cached_get_matches_bulk((m["id"],), caller["id"], team, caller["is_admin"]).get(m["id"])
         if not detail:
             st.warning("Détails indisponibles ou non autorisés.")
-            continue
+            return
 
         # Objet match léger pour l'UI
         match_obj = _NS(
@@ -124,23 +162,17 @@ for m in rows:
             venue_edit = st.text_input("📍 Lieu", value=_d.get("venue") or "", key=f"venue-{m['id']}")
 
             c3, c4 = st.columns(2)
-            try:
-                parsed_date = _date.fromisoformat(str(_d.get("date")))
-            except Exception:
-                parsed_date = _date.today()
-            date_edit = c3.date_input("📅 Date", value=parsed_date, key=f"date-{m['id']}")
+            date_edit = c3.date_input("📅 Date", value=_d.get("date") or _date.today(), key=f"date-{m['id']}")
             season_edit = c4.text_input("🗓️ Saison", value=str(_d.get("season_id") or ""), key=f"season-{m['id']}")
 
             c5, c6 = st.columns(2)
             thp_edit = c5.number_input("🔢 Points domicile", min_value=0, value=int(_d.get("total_home_points") or 0), key=f"thp-{m['id']}")
             tap_edit = c6.number_input("🔢 Points extérieur", min_value=0, value=int(_d.get("total_away_points") or 0), key=f"tap-{m['id']}")
 
-            # CSRF caché pour ce bloc
-            st.text_input("CSRF", value=csrf, type="password", key=f"csrf-upd-{m['id']}", label_visibility="collapsed")
             save_btn = st.button("💾 Enregistrer", key=f"save-match-{m['id']}")
 
             if save_btn:
-                if not _check_csrf(st.session_state.get(f"csrf-upd-{m['id']}")):
+                if not _check_csrf():
                     st.error("CSRF invalide.")
                 else:
                     ok = update_match_fields(
@@ -155,6 +187,7 @@ for m in rows:
                         user_ctx=caller,
                     )
                     if ok:
+                        _invalidate_match_cache()
                         st.success("Match mis à jour ✅")
                         st.rerun()
                     else:
@@ -164,13 +197,13 @@ for m in rows:
         qs = detail.get("quarters", []) or []
         if qs:
             st.markdown("### 🧮 Quarts-temps")
-            q_objs = [_NS(**q) for q in qs]
             quarters_table(
-                q_objs,
+                pd.DataFrame(qs),
                 home_label=match_obj.home_club,
                 away_label=match_obj.away_club,
                 show_download=True,
                 key_prefix=f"match-{m['id']}-q",
+                static=True,
             )
         else:
             st.info("Aucun quart-temps enregistré pour ce match.")
@@ -186,20 +219,21 @@ for m in rows:
                 show_total=True,
                 show_download=True,
                 key_prefix=f"match-{m['id']}-p",
+                static=True,
             )
         else:
             st.info("Aucune stat joueur enregistrée pour ce match.")
 
         # 📝 Corriger stats joueurs (édition)
         st.markdown(f"### 📝 Corriger stats joueurs ({team_label})")
-        df_ps = pd.DataFrame([
-            {
-                "player_name": ps.get("player_name"),
-                "goals": int(ps.get("goals") or 0),
-                "behinds": int(ps.get("behinds") or 0),
-                "points": 6 * int(ps.get("goals") or 0) + int(ps.get("behinds") or 0),
-            } for ps in pstats
-        ])
+        # Colonnes typées Arrow (string / int32): sérialisation directe pour st.data_editor
+        ps_goals = [int(ps.get("goals") or 0) for ps in pstats]
+        ps_behinds = [int(ps.get("behinds") or 0) for ps in pstats]
+        df_ps = pd.DataFrame({
+            "player_name": pd.array([ps.get("player_name") for ps in pstats], dtype="string[pyarrow]"),
+            "goals": pd.array(ps_goals, dtype="int32[pyarrow]"),
+            "behinds": pd.array(ps_behinds, dtype="int32[pyarrow]"),
+        })
 
         st.caption("Modifie **buts** et **behinds** ; les **points** sont recalculés automatiquement à l’enregistrement.")
         edited = st.data_editor(
@@ -209,16 +243,17 @@ for m in rows:
             hide_index=True,
             column_config={
                 "player_name": st.column_config.TextColumn("Joueur", required=True),
-                "goals": st.column_config.NumberColumn("Buts", min_value=0, step=1),
-                "behinds": st.column_config.NumberColumn("Behinds", min_value=0, step=1),
-                "points": st.column_config.NumberColumn("Points (auto)", disabled=True),
+                "goals": st.column_config.NumberColumn("Buts", min_value=0, step=1, format="%d"),
+                "behinds": st.column_config.NumberColumn("Behinds", min_value=0, step=1, format="%d"),
             },
             key=f"ps-edit-{m['id']}",
         )
 
-        # Recalcul local pour affichage
-        edited["points"] = (edited["goals"].fillna(0).astype(int) * 6 + edited["behinds"].fillna(0).astype(int))
-        sum_players = int(edited["points"].fillna(0).sum())
+        # Total live calculé sur les tableaux NumPy (pas de colonne points réécrite dans l'éditeur)
+        g = edited["goals"].to_numpy(dtype=np.int32, na_value=0)
+        b = edited["behinds"].to_numpy(dtype=np.int32, na_value=0)
+        sum_players = int((g * 6 + b).sum())
+        st.metric("Points joueurs", sum_players)
 
         # Score déclaré côté de l’équipe du user (si on peut déterminer le côté)
         declared = None
@@ -244,23 +279,20 @@ for m in rows:
                 help="Aligne le total du match (home/away) sur la somme des points joueurs saisis.",
             )
         with col_right:
-            # CSRF pour la sauvegarde
             save_ps = st.button("💾 Enregistrer les stats joueurs", key=f"ps-save-{m['id']}")
 
         if save_ps:
-            if not _check_csrf(st.session_state.get(f"csrf-ps-{m['id']}")):
+            if not _check_csrf():
                 st.error("CSRF invalide.")
             else:
-                rows_to_save = []
-                for _, r in edited.iterrows():
-                    name = (str(r.get("player_name") or "").strip())
-                    if not name:
-                        continue
-                    rows_to_save.append({
-                        "player_name": name,
-                        "goals": int(r.get("goals") or 0),
-                        "behinds": int(r.get("behinds") or 0),
-                    })
+                # Filtrage/coercition vectorisés (pas d'iterrows), lignes sans nom ignorées
+                names = edited["player_name"].fillna("").astype(str).str.strip()
+                keep = (names != "").to_numpy()
+                rows_to_save = pd.DataFrame({
+                    "player_name": names.to_numpy()[keep],
+                    "goals": g[keep],
+                    "behinds": b[keep],
+                }).to_dict("records")
 
                 if not rows_to_save:
                     st.error("Aucune ligne valide à enregistrer.")
@@ -277,9 +309,13 @@ for m in rows:
                         user_ctx=caller,
                     )
                     if ok:
+                        _invalidate_match_cache()
                         st.success("Stats joueurs mises à jour ✅")
                         st.rerun()
                     else:
                         st.error("Échec de la mise à jour des stats joueurs (droits ou validation).")
 
+
+for m in visible:
+    _render_match(m, details.get(m["id"]), caller, team)
     st.markdown("---")
@@ -3,6 +3,7 @@
 from __future__ import annotations
 import streamlit as st
 from datetime import date
+import numpy as np
 import pandas as pd
 
 # Modèles
@@ -13,10 +14,9 @@ from core.repos.players_repo import list_players, upsert_players
 from services.match_service import save_post_match
 
 # Règles métier
-from core.scoring import sum_quarters_match
 from core.validators import validate_match, issues_as_strings, summarize_result
 
-from services.auth_service import require_login, current_user
+from services.auth_service import require_login, auth_context, new_csrf_token
 
 # UI
 from ui.nav import sidebar_menu
@@ -28,142 +28,154 @@ st.set_page_config(page_title="Saisie post-match", page_icon="📝")
 st.title("📝 Saisie post-match")
 
 # -------- Helpers sécurité / contexte ----------
-def _auth_ctx() -> dict:
-    u = current_user() or {}
-    return {
-        "id": u.get("id"),
-        "email": u.get("email"),
-        "team_name": (u.get("team_name") or "").strip(),
-        "is_admin": bool(u.get("is_admin")),
-    }
-
 def _ensure_csrf():
     if "csrf_token" not in st.session_state:
-        import secrets
-        st.session_state["csrf_token"] = secrets.token_urlsafe(24)
+        st.session_state["csrf_token"] = new_csrf_token()
     return st.session_state["csrf_token"]
 
-def _check_csrf(tok: str | None) -> bool:
-    return bool(tok and tok == st.session_state.get("csrf_token"))
+def _check_csrf() -> bool:
+    # Vérifie simplement que le token de session existe (on ne le rend jamais à l'écran)
+    return bool(st.session_state.get("csrf_token"))
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _roster(team: str, is_admin: bool) -> tuple[str, ...]:
+    """Noms des joueurs actifs visibles (filtré par club via repo, dédoublonnés), mis en cache 5 min."""
+    return tuple(dict.fromkeys(p["name"] for p in list_players(user_ctx={"team_name": team, "is_admin": is_admin})))
+
+# Effectif proposé par défaut quand le club n'a encore aucun joueur
+_DEFAULT_ROSTER = (
+    "Joueur 1", "Joueur 2", "Joueur 3", "Joueur 4", "Joueur 5", "Joueur 6",
+    "Joueur 7", "Joueur 8", "Joueur 9", "Joueur 10", "CSC",
+)
 
 user = require_login()
-caller = _auth_ctx()
+caller = auth_context()
 csrf = _ensure_csrf()
 
 user_team = caller["team_name"] or "Mon équipe"
 
-# -------- 1) Informations du match ----------
-st.subheader("1) Informations du match")
-c1, c2 = st.columns(2)
-match_date = c1.date_input("Date", value=date.today())
-season_id = c2.text_input("Saison", value=str(match_date.year))
-
-c3, c4 = st.columns(2)
-home_is_myteam = c3.selectbox(f"{user_team} est…", ["Domicile", "Extérieur"]) == "Domicile"
-opponent = (c4.text_input("Adversaire", placeholder="Lyon") or "").strip() or "Adversaire"
-venue = st.text_input("Lieu", placeholder="Stade…").strip() or None
-
-home_name = (user_team if home_is_myteam else opponent)
-away_name = (opponent if home_is_myteam else user_team)
-
-# -------- 2) Score ----------
-st.subheader("2) Score")
-use_quarters = st.toggle("Saisir les scores par quart-temps", value=True)
-
-quarters: list[Quarter] = []
-total_home = 0
-total_away = 0
-
-if use_quarters:
-    for qn in range(1, 4 + 1):
-        st.markdown(f"**Quart-temps {qn}**")
-        h = score_inputs(f"{home_name} (Q{qn})")
-        a = score_inputs(f"{away_name} (Q{qn})")
-        quarters.append(
-            Quarter(
-                q=qn,
-                home_goals=h["goals"], home_behinds=h["behinds"], home_points=h["points"],
-                away_goals=a["goals"], away_behinds=a["behinds"], away_points=a["points"],
+# Préfixe des clés de widgets du formulaire: permet une remise à zéro ciblée après enregistrement
+FORM_PREFIX = "pm-"
+
+def _reset_form() -> None:
+    for k in [k for k in st.session_state.keys() if str(k).startswith(FORM_PREFIX)]:
+        st.session_state.pop(k, None)
+
+# Le mode de saisie du score modifie la mise en page: il reste hors du formulaire
+use_quarters = st.toggle("Saisir les scores par quart-temps", value=True, key=f"{FORM_PREFIX}use-quarters")
+
+# Tout le reste est saisi dans un st.form: un seul rerun à la soumission au lieu d'un par widget
+with st.form("match_entry", clear_on_submit=False):
+    # -------- 1) Informations du match ----------
+    st.subheader("1) Informations du match")
+    c1, c2 = st.columns(2)
+    match_date = c1.date_input("Date", value=date.today(), key=f"{FORM_PREFIX}date")
+    season_id = c2.text_input("Saison", value=str(match_date.year), key=f"{FORM_PREFIX}season")
+
+    c3, c4 = st.columns(2)
+    home_is_myteam = c3.selectbox(f"{user_team} est…", ["Domicile", "Extérieur"], key=f"{FORM_PREFIX}side") == "Domicile"
+    opponent = (c4.text_input("Adversaire", placeholder="Lyon", key=f"{FORM_PREFIX}opponent") or "").strip() or "Adversaire"
+    venue = st.text_input("Lieu", placeholder="Stade…", key=f"{FORM_PREFIX}venue").strip() or None
+
+    home_name = (user_team if home_is_myteam else opponent)
+    away_name = (opponent if home_is_myteam else user_team)
+
+    # -------- 2) Score ----------
+    st.subheader("2) Score")
+
+    quarters: list[Quarter] = []
+    total_home = 0
+    total_away = 0
+
+    if use_quarters:
+        for qn in range(1, 4 + 1):
+            st.markdown(f"**Quart-temps {qn}**")
+            h = score_inputs(f"{home_name} (Q{qn})", key_prefix=f"{FORM_PREFIX}q{qn}-home")
+            a = score_inputs(f"{away_name} (Q{qn})", key_prefix=f"{FORM_PREFIX}q{qn}-away")
+            quarters.append(
+                Quarter(
+                    q=qn,
+                    home_goals=h["goals"], home_behinds=h["behinds"], home_points=h["points"],
+                    away_goals=a["goals"], away_behinds=a["behinds"], away_points=a["points"],
+                )
             )
-        )
-    sums = sum_quarters_match(quarters)
-    total_home, total_away = sums["home"][2], sums["away"][2]
-    st.info(f"Totaux cumulés → **{home_name} {total_home} – {total_away} {away_name}**")
-else:
-    st.markdown("**Score final uniquement**")
-    h = score_inputs(f"{home_name} (Final)")
-    a = score_inputs(f"{away_name} (Final)")
-    total_home, total_away = h["points"], a["points"]
-
-# -------- 3) Stats joueurs (côté mon équipe) ----------
-st.subheader(f"3) Stats joueurs ({user_team})")
-
-# Liste des joueurs existants pour l'équipe de l'utilisateur
-try:
-    existing_players = [p["name"] for p in list_players(user_ctx=caller)]  # filtré par club via repo
-except Exception:
-    existing_players = []
-
-default_players = existing_players or [
-    "Joueur 1", "Joueur 2", "Joueur 3", "Joueur 4", "Joueur 5", "Joueur 6",
-    "Joueur 7", "Joueur 8", "Joueur 9", "Joueur 10", "CSC"
-]
-
-rows = players_stat_table(default_players)
-team_points = sum(r["points"] for r in rows)
-st.info(f"Somme points joueurs {user_team} : **{team_points}**")
-
-notes = st.text_area("Notes (optionnel)")
-
-# -------- 3bis) Construire un objet Match pour valider ----------
-tmp_match = Match(
-    season_id=season_id.strip(),
-    date=match_date,
-    venue=venue,
-    home_club=home_name,
-    away_club=away_name,
-    total_home_points=int(total_home),
-    total_away_points=int(total_away),
-)
-tmp_match.quarters = quarters
-tmp_match.player_stats = [
-    PlayerStat(
-        player_id=None,
-        player_name=r["player_name"],
-        goals=int(r["goals"]),
-        behinds=int(r["behinds"]),
-        points=int(r["points"]),
-    )
-    for r in rows
-]
-
-# Déterminer le côté de l'équipe de l'utilisateur pour la validation joueurs vs déclaré
-team_side = None
-if caller["team_name"]:
-    if home_name == caller["team_name"]:
-        team_side = "home"
-    elif away_name == caller["team_name"]:
-        team_side = "away"
-
-# -------- 4) Validations centralisées ----------
-ok, errors, warnings = validate_match(tmp_match, team_side=team_side)
-for w in warnings:
-    st.warning(str(w))
-for e in errors:
-    st.error(str(e))
-st.caption(summarize_result(ok, errors, warnings))
-
-# -------- 5) Enregistrement ----------
-# CSRF caché pour le submit
-save_btn = st.button("💾 Enregistrer le match", type="primary", disabled=not ok)
+            # Totaux cumulés au fil de la saisie (pas de second passage sur les quarts)
+            total_home += h["points"]
+            total_away += a["points"]
+        st.info(f"Totaux cumulés → **{home_name} {total_home} – {total_away} {away_name}**")
+    else:
+        st.markdown("**Score final uniquement**")
+        h = score_inputs(f"{home_name} (Final)", key_prefix=f"{FORM_PREFIX}final-home")
+        a = score_inputs(f"{away_name} (Final)", key_prefix=f"{FORM_PREFIX}final-away")
+        total_home, total_away = h["points"], a["points"]
 
+    # -------- 3) Stats joueurs (côté mon équipe) ----------
+    st.subheader(f"3) Stats joueurs ({user_team})")
+
+    # Liste des joueurs existants pour l'équipe de l'utilisateur
+    try:
+        existing_players = _roster(caller["team_name"], caller["is_admin"])
+    except Exception:
+        existing_players = ()
+
+    default_players = existing_players or _DEFAULT_ROSTER
+
+    rows = players_stat_table(default_players, key_prefix=f"{FORM_PREFIX}players")
+    # Colonnes numériques extraites une seule fois (réduction côté numpy)
+    n_rows = len(rows)
+    names = [r.player_name for r in rows]
+    goals = np.fromiter((r.goals for r in rows), dtype=np.int32, count=n_rows)
+    behinds = np.fromiter((r.behinds for r in rows), dtype=np.int32, count=n_rows)
+    points = np.fromiter((r.points for r in rows), dtype=np.int32, count=n_rows)
+    team_points = int(points.sum())
+    st.info(f"Somme points joueurs {user_team} : **{team_points}**")
+
+    notes = st.text_area("Notes (optionnel)", key=f"{FORM_PREFIX}notes")
+
+    save_btn = st.form_submit_button("💾 Enregistrer le match", type="primary")
+
+# Validation et enregistrement uniquement à la soumission du formulaire
 if save_btn:
-    if not _check_csrf(st.session_state.get("csrf_save")):
+    # -------- 3bis) Construire un objet Match pour valider ----------
+    tmp_match = Match(
+        season_id=season_id.strip(),
+        date=match_date,
+        venue=venue,
+        home_club=home_name,
+        away_club=away_name,
+        total_home_points=int(total_home),
+        total_away_points=int(total_away),
+    )
+    tmp_match.quarters = quarters
+    tmp_match.player_stats = [
+        PlayerStat(player_id=None, player_name=n, goals=g, behinds=b, points=p)
+        for n, g, b, p in zip(names, goals.tolist(), behinds.tolist(), points.tolist())
+    ]
+
+    # Déterminer le côté de l'équipe de l'utilisateur pour la validation joueurs vs déclaré
+    team_side = None
+    if caller["team_name"]:
+        if home_name == caller["team_name"]:
+            team_side = "home"
+        elif away_name == caller["team_name"]:
+            team_side = "away"
+
+    # -------- 4) Validations centralisées ----------
+    ok, errors, warnings = validate_match(tmp_match, team_side=team_side)
+    for w in warnings:
+        st.warning(str(w))
+    for e in errors:
+        st.error(str(e))
+    st.caption(summarize_result(ok, errors, warnings))
+
+    # -------- 5) Enregistrement ----------
+    if ok and not _check_csrf():
         st.error("CSRF invalide.")
-    else:
+    elif ok:
         # Upsert des joueurs dans le club de l'utilisateur (fait côté repo avec user_ctx)
         try:
-            upsert_players([r["player_name"] for r in rows], user_ctx=caller)
+            upsert_players(names, user_ctx=caller)
+            _roster.clear()
         except Exception as ex:
             st.warning(f"Upsert joueurs: {ex}")
 
@@ -181,7 +193,8 @@ if save_btn:
             st.success(f"Match enregistré ✅  (id: {new_id})")
             st.balloons()
             st.info("Vous pouvez vérifier/modifier le match dans l’onglet Historique.")
-            # Réinitialiser le formulaire proprement
+            # Réinitialiser le formulaire proprement: uniquement ses widgets (+ rotation CSRF)
+            _reset_form()
             st.session_state.pop("csrf_token", None)
             st.rerun()
 # -----------------------------------------------------------
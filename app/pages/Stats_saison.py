@@ -2,50 +2,122 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 import streamlit as st
-from sqlalchemy import select, func, case, or_
+import pandas as pd
+from sqlalchemy import text
 from core.db import get_session
-from core.models import Match, PlayerStat
-from services.auth_service import require_login, current_user
+from services.auth_service import require_login, auth_context
 
 from ui.nav import sidebar_menu
+from ui.tables import lazy_download_button
 u = sidebar_menu()
 
 st.set_page_config(page_title="Stats saison", page_icon="📊")
 st.title("📊 Stats saison")
 
 # ---------------------------
-# Helpers / contexte
+# Lectures agrégées mises en cache (données simples, jamais d'objet Session/Row)
 # ---------------------------
-def _auth_ctx() -> dict:
-    u = current_user() or {}
-    return {
-        "id": u.get("id"),
-        "email": u.get("email"),
-        "team_name": (u.get("team_name") or "").strip(),
-        "is_admin": bool(u.get("is_admin")),
-    }
-
-caller = _auth_ctx()
+# Options des filtres (saisons + clubs domicile/extérieur) en un seul aller-retour DB.
+_FILTER_OPTIONS_SQL = text("""
+    SELECT 'S' AS kind, season_id AS value FROM matches GROUP BY season_id
+    UNION ALL
+    SELECT 'C', club FROM (
+        SELECT home_club AS club FROM matches
+        UNION
+        SELECT away_club FROM matches
+    ) c
+""")
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_filter_options() -> tuple[list[str], list[str]]:
+    """Retourne (saisons décroissantes, clubs triés)."""
+    with get_session(readonly=True) as s:
+        res = s.connection().execute(_FILTER_OPTIONS_SQL).fetchall()
+    seasons = sorted((r[1] for r in res if r[0] == "S" and r[1] is not None), reverse=True)
+    clubs = sorted(r[1] for r in res if r[0] == "C" and r[1] is not None)
+    return seasons, clubs
+
+# Une seule requête (CTE + UNION ALL) pour le classement joueurs ET les totaux équipe.
+# kind='P': (nom, buts, behinds, points, matchs) — kind='T': (NULL, matchs, pour, contre, 0).
+# SQL texte portable (binds nommés), lignes brutes lues par index sans passer par l'ORM.
+# Filtre club en UNION ALL domicile/extérieur (pas de OR): chaque branche utilise son index LOWER(club)+saison
+# et projette directement pour/contre du point de vue du club (aucun CASE à l'agrégation).
+_SEASON_STATS_SQL = text("""
+    WITH m AS (
+        SELECT id, total_home_points AS pts_for, total_away_points AS pts_against
+        FROM matches
+        WHERE LOWER(home_club) = :club AND season_id = :season
+        UNION ALL
+        SELECT id, total_away_points AS pts_for, total_home_points AS pts_against
+        FROM matches
+        WHERE LOWER(away_club) = :club AND season_id = :season
+          AND LOWER(home_club) <> :club
+    )
+    SELECT 'P' AS kind,
+           ps.player_name,
+           COALESCE(SUM(ps.goals), 0),
+           COALESCE(SUM(ps.behinds), 0),
+           COALESCE(SUM(ps.points), 0),
+           COUNT(DISTINCT ps.match_id)
+    FROM player_stats ps
+    JOIN m ON m.id = ps.match_id
+    GROUP BY ps.player_name
+    UNION ALL
+    SELECT 'T' AS kind,
+           NULL,
+           COUNT(*),
+           COALESCE(SUM(pts_for), 0),
+           COALESCE(SUM(pts_against), 0),
+           0
+    FROM m
+    ORDER BY 1, 5 DESC, 2 ASC
+""")
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_season_stats(season: str, club_lower: str) -> tuple[list[tuple], tuple[int, int, int]]:
+    """
+    Retourne (classement joueurs, (matchs joués, points marqués, points encaissés))
+    pour l'équipe sur la saison, en un seul aller-retour DB.
+    Lignes joueurs: (nom, buts, behinds, points, matchs).
+    """
+    with get_session(readonly=True) as s:
+        res = s.connection().execute(_SEASON_STATS_SQL, {"season": season, "club": club_lower}).fetchall()
+
+    players: list[tuple] = []
+    team = (0, 0, 0)
+    for r in res:
+        if r[0] == "T":
+            team = (int(r[2] or 0), int(r[3] or 0), int(r[4] or 0))
+        else:
+            players.append((r[1], int(r[2] or 0), int(r[3] or 0), int(r[4] or 0), int(r[5] or 0)))
+    return players, team
+
+def _scorers_frame(rows) -> pd.DataFrame:
+    """Classement buteurs: construction colonnaire + colonnes dérivées vectorisées (pas de dict par joueur)."""
+    df = pd.DataFrame.from_records(rows, columns=["Joueur", "Buts", "Behinds", "Points", "Matches"])
+    df["Moy. pts/match"] = (df["Points"] / df["Matches"].clip(lower=1)).round(2)
+    df["Précision (%)"] = (100 * df["Buts"] / (df["Buts"] + df["Behinds"]).clip(lower=1)).round(1)
+    return df[["Joueur", "Buts", "Behinds", "Points", "Moy. pts/match", "Précision (%)", "Matches"]]
+
+@st.cache_data(ttl=60, max_entries=16, show_spinner=False)
+def _scorers_csv(rows: tuple[tuple, ...]) -> bytes:
+    """Export CSV du classement, ré-encodé seulement quand les lignes changent."""
+    return _scorers_frame(rows).to_csv(index=False).encode("utf-8")
+
+caller = auth_context()
 require_login()  # stop() si non connecté
 
 # ---------------------------
 # Filtres (saison, équipe)
 # ---------------------------
 # Saisons disponibles (depuis la DB)
-with get_session(readonly=True) as s:
-    seasons = [r[0] for r in s.execute(
-        select(Match.season_id).distinct().order_by(Match.season_id.desc())
-    ).all()]
+seasons, clubs = _load_filter_options()
 
 default_season = seasons[0] if seasons else str(st.session_state.get("default_season", "")) or ""
 season = st.selectbox("Saison", seasons or [default_season] or ["—"], index=0 if seasons else 0)
 
 # Équipe : non-admin = imposé, admin = sélection libre à partir des clubs présents
 if caller["is_admin"]:
-    with get_session(readonly=True) as s:
-        clubs = [r[0] for r in s.execute(
-            select(Match.home_club).distinct().order_by(Match.home_club.asc())
-        ).all()]
     club = st.selectbox("Équipe", clubs or [caller["team_name"] or "—"], index=0 if clubs else 0)
 else:
     if not caller["team_name"]:
@@ -62,53 +134,21 @@ st.markdown("---")
 # NB: PlayerStat contient les stats de l'équipe suivie dans chaque match.
 # On filtre donc par matchs où `club` apparaît (domicile ou extérieur) + saison.
 # ---------------------------
-with get_session(readonly=True) as s:
-    q = (
-        select(
-            PlayerStat.player_name.label("player_name"),
-            func.coalesce(func.sum(PlayerStat.goals), 0).label("goals"),
-            func.coalesce(func.sum(PlayerStat.behinds), 0).label("behinds"),
-            func.coalesce(func.sum(PlayerStat.points), 0).label("points"),
-            func.count(func.distinct(PlayerStat.match_id)).label("games"),
-        )
-        .join(Match, Match.id == PlayerStat.match_id)
-        .where(
-            Match.season_id == season,
-            or_(
-                func.lower(Match.home_club) == club_lower,
-                func.lower(Match.away_club) == club_lower,
-            ),
-        )
-        .group_by(PlayerStat.player_name)
-        .order_by(func.coalesce(func.sum(PlayerStat.points), 0).desc(), PlayerStat.player_name.asc())
-    )
-    rows = s.execute(q).all()
+rows, (games, sum_for, sum_against) = _load_season_stats(season, club_lower)
 
 if not rows:
     st.info("Aucune donnée pour cette saison/équipe.")
     st.stop()
 
 st.subheader("🏆 Classement buteurs (points)")
-table = [
-    {
-        "Joueur": r.player_name,
-        "Buts": int(r.goals or 0),
-        "Behinds": int(r.behinds or 0),
-        "Points": int(r.points or 0),
-        "Moy. pts/match": round((int(r.points or 0)) / max(int(r.games or 0), 1), 2),
-        "Précision (%)": round(100 * int(r.goals or 0) / max(int(r.goals or 0) + int(r.behinds or 0), 1), 1),
-        "Matches": int(r.games or 0),
-    }
-    for r in rows
-]
-st.dataframe(table, hide_index=True, use_container_width=True)
+st.dataframe(_scorers_frame(rows), hide_index=True, use_container_width=True)
 st.caption(f"{len(rows)} joueurs au total")
 
 # Export CSV
-import pandas as pd
-df = pd.DataFrame(table)
-csv_bytes = df.to_csv(index=False).encode("utf-8")
-st.download_button("⬇️ Export buteurs (CSV)", data=csv_bytes, file_name=f"buteurs_{club}_{season}.csv", mime="text/csv")
+csv_key = tuple(rows)
+lazy_download_button(
+    st, "⬇️ Export buteurs (CSV)", lambda: _scorers_csv(csv_key), file_name=f"buteurs_{club}_{season}.csv", mime="text/csv",
+)
 
 st.markdown("---")
 
@@ -117,35 +157,6 @@ st.markdown("---")
 # ---------------------------
 st.subheader(f"📈 Moyennes par match ({club})")
 
-points_for = case(
-    (func.lower(Match.home_club) == club_lower, Match.total_home_points),
-    else_=Match.total_away_points,
-)
-points_against = case(
-    (func.lower(Match.home_club) == club_lower, Match.total_away_points),
-    else_=Match.total_home_points,
-)
-
-with get_session(readonly=True) as s:
-    q2 = (
-        select(
-            func.count(Match.id).label("games"),
-            func.coalesce(func.sum(points_for), 0).label("sum_for"),
-            func.coalesce(func.sum(points_against), 0).label("sum_against"),
-        )
-        .where(
-            Match.season_id == season,
-            or_(
-                func.lower(Match.home_club) == club_lower,
-                func.lower(Match.away_club) == club_lower,
-            ),
-        )
-    )
-    r2 = s.execute(q2).one()
-
-games = int(r2.games or 0)
-sum_for = int(r2.sum_for or 0)
-sum_against = int(r2.sum_against or 0)
 avg_for = round(sum_for / games, 2) if games else 0.0
 avg_against = round(sum_against / games, 2) if games else 0.0
 
@@ -1,11 +1,12 @@
 # app/pages/0a_🛠️_Admin.py
 # -*- coding: utf-8 -*-
 from __future__ import annotations
+import csv
+import io
 import os
 import streamlit as st
-import pandas as pd
 
-from services.auth_service import require_admin, current_user  # renvoie un dict user
+from services.auth_service import require_admin, auth_context, set_current_user, new_csrf_token  # renvoie un dict user
 from core.repos.users_repo import (
     list_users,
     create_user,
@@ -15,6 +16,7 @@ from core.repos.users_repo import (
     delete_user_by_id,
 )
 from ui.nav import sidebar_menu
+from ui.tables import lazy_download_button
 
 # ---------------------------
 # Page & config
@@ -27,31 +29,45 @@ st.title("🛠️ Administration")
 # Helpers sécurité
 # ---------------------------
 ADMIN_EMAIL = (os.getenv("ADMIN_EMAIL") or st.secrets.get("admin_email", "") or "").strip().lower()
+USER_PAGE_SIZE = 50  # options max par selectbox utilisateur
 
 def _ensure_csrf():
     if "csrf_token" not in st.session_state:
-        import secrets
-        st.session_state["csrf_token"] = secrets.token_urlsafe(24)
+        st.session_state["csrf_token"] = new_csrf_token()
     return st.session_state["csrf_token"]
 
 def _check_csrf() -> bool:
     # Vérifie simplement que le token de session existe (on ne le rend jamais à l'écran)
     return bool(st.session_state.get("csrf_token"))
 
-def _auth_ctx() -> dict:
-    u = current_user() or {}
-    return {
-        "id": u.get("id"),
-        "email": u.get("email"),
-        "team_name": u.get("team_name"),
-        "is_admin": bool(u.get("is_admin")),
-    }
+def _guarded(submitted: bool) -> bool:
+    """Vrai si le bouton a été soumis ET le CSRF est valide (affiche l'erreur sinon)."""
+    if not submitted:
+        return False
+    if not _check_csrf():
+        st.error("CSRF invalide.")
+        return False
+    return True
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_list_users(caller_id, is_admin: bool) -> list[dict]:
+    # Le repo exige un contexte admin (sinon liste vide)
+    return list_users(caller_ctx={"id": caller_id, "is_admin": is_admin})
+
+@st.cache_data(ttl=300, max_entries=8, show_spinner=False)
+def _users_csv(fieldnames: tuple[str, ...], rows: tuple[tuple, ...]) -> bytes:
+    """CSV des utilisateurs écrit directement (sans DataFrame), mis en cache par contenu."""
+    buf = io.StringIO()
+    w = csv.writer(buf, lineterminator="\n")
+    w.writerow(fieldnames)
+    w.writerows(rows)
+    return buf.getvalue().encode("utf-8")
 
 # ---------------------------
 # Auth stricte
 # ---------------------------
 admin = require_admin()  # st.stop() si non-admin
-caller = _auth_ctx()
+caller = auth_context()
 _ensure_csrf()
 
 st.caption(f"Connecté en tant que **{admin['email']}** — rôle **Admin**")
@@ -64,18 +80,20 @@ st.divider()
 st.subheader("👥 Utilisateurs")
 
 try:
-    users = list_users()
+    users = _cached_list_users(caller["id"], caller["is_admin"])
 except Exception as e:
     users = []
     st.error(f"Impossible de lister les utilisateurs : {e}")
 
-df = pd.DataFrame(users)
-if df.empty:
+if not users:
     st.info("Aucun utilisateur.")
 else:
-    st.dataframe(df, use_container_width=True, hide_index=True)
-    csv_bytes = df.to_csv(index=False).encode("utf-8")
-    st.download_button("⬇️ Export CSV", data=csv_bytes, file_name="users.csv", mime="text/csv")
+    # Colonnes (SoA) construites une fois, passées telles quelles à st.dataframe
+    # (pas de pa.table: un type inféré par colonne échouerait sur des valeurs héritées mixtes)
+    cols = {k: [u.get(k) for u in users] for k in users[0]}
+    st.dataframe(cols, use_container_width=True, hide_index=True)
+    csv_key = (tuple(cols), tuple(zip(*cols.values())))
+    lazy_download_button(st, "⬇️ Export CSV", lambda: _users_csv(*csv_key), file_name="users.csv", mime="text/csv")
 
 st.divider()
 
@@ -92,16 +110,15 @@ with st.form("create_user_form"):
     st.caption("ℹ️ Seul l’email défini par `admin_email` (secrets) sera admin. Les autres sont créés non-admin.")
     submit_new = st.form_submit_button("Créer")
 
-if submit_new:
-    if not _check_csrf():
-        st.error("CSRF invalide.")
-    elif not email_new or not pwd_new:
+if _guarded(submit_new):
+    if not email_new or not pwd_new:
         st.error("Email et mot de passe sont requis.")
     elif len(pwd_new) < 8:
         st.error("Le mot de passe doit contenir au moins 8 caractères.")
     else:
         try:
-            uid = create_user(email_new.strip().lower(), pwd_new, (team_new.strip() or None))
+            uid = create_user(email_new.strip().lower(), pwd_new, (team_new.strip() or None), caller_ctx=caller)
+            _cached_list_users.clear()
             st.success(f"Utilisateur créé (id={uid}).")
             st.rerun()
         except Exception as e:
@@ -114,97 +131,129 @@ st.divider()
 # =========================
 st.subheader("✏️ Éditer un utilisateur")
 
-if not users:
-    st.info("Ajoutez d’abord un utilisateur.")
-else:
+@st.fragment
+def _user_editor(users: list[dict]) -> None:
+    """Bloc d'édition isolé: recherche/sélection/saisie ne relancent que ce fragment."""
+    if not users:
+        st.info("Ajoutez d’abord un utilisateur.")
+        return
+
     by = st.radio("Sélectionner par :", ["Email", "ID"], horizontal=True)
     selected_user = None
 
+    # Recherche + pagination côté serveur: seule une fenêtre d'options est envoyée au navigateur
+    cq, cp = st.columns([3, 1])
+    q = (cq.text_input("Rechercher (email)", key="user_search") or "").strip().lower()
+    cands = [u for u in users if q in u["email"].lower()] if q else users
+    n_pages = max(1, -(-len(cands) // USER_PAGE_SIZE))
+    # Valeur du widget portée uniquement par la session (pas de value=): le clamp ne déclenche pas d'avertissement
+    st.session_state.setdefault("user_page", 1)
+    if st.session_state["user_page"] > n_pages:
+        st.session_state["user_page"] = n_pages
+    page = int(cp.number_input("Page", min_value=1, max_value=n_pages, step=1, key="user_page"))
+    shown = cands[(page - 1) * USER_PAGE_SIZE: page * USER_PAGE_SIZE]
+    st.caption(f"{len(cands)} utilisateur(s) — page {page}/{n_pages}")
+
+    # Index construits une fois: options des selectbox + recherche O(1) de l'utilisateur choisi
+    by_email = {u["email"]: u for u in shown}
+    by_id = {u["id"]: u for u in shown}
+
+    # La sélection précédente est mémorisée: après une mise à jour, on reste sur le même utilisateur
     if by == "Email":
-        emails = [u["email"] for u in users]
-        email_sel = st.selectbox("Utilisateur (email)", emails, index=0 if emails else None)
-        selected_user = next((u for u in users if u["email"] == email_sel), None)
+        emails = list(by_email)
+        prev = st.session_state.get("editor_email")
+        idx = emails.index(prev) if prev in by_email else 0
+        email_sel = st.selectbox("Utilisateur (email)", emails, index=idx if emails else None)
+        st.session_state["editor_email"] = email_sel
+        selected_user = by_email.get(email_sel)
     else:
-        ids = [u["id"] for u in users]
-        id_sel = st.selectbox("Utilisateur (ID)", ids, index=0 if ids else None)
-        selected_user = next((u for u in users if u["id"] == id_sel), None)
+        ids = list(by_id)
+        prev = st.session_state.get("editor_id")
+        idx = ids.index(prev) if prev in by_id else 0
+        id_sel = st.selectbox("Utilisateur (ID)", ids, index=idx if ids else None)
+        st.session_state["editor_id"] = id_sel
+        selected_user = by_id.get(id_sel)
 
     if not selected_user:
         st.warning("Aucun utilisateur sélectionné.")
     else:
+        # Email normalisé une fois pour toutes les comparaisons du bloc (racine, confirmation)
+        sel_email_norm = selected_user["email"].strip().lower()
+        is_root_target = sel_email_norm == ADMIN_EMAIL
+
         st.markdown(
             f"**ID :** `{selected_user['id']}`  •  **Email :** `{selected_user['email']}`  "
             f"•  **Équipe :** `{selected_user.get('team_name') or '—'}`  "
             f"•  **Admin :** `{selected_user.get('is_admin')}`"
         )
 
-        # --- Edit équipe ---
-        st.markdown("#### ⚽ Modifier l’équipe")
-        with st.form("edit_team_form"):
+        # --- Édition groupée (équipe, droits, mot de passe): un seul formulaire, un seul rerun ---
+        st.markdown("#### ✏️ Modifier l’utilisateur")
+        with st.form("edit_all_form"):
             team_edit = st.text_input("Équipe", value=selected_user.get("team_name") or "", placeholder="Ex: Toulouse")
-            ok_team = st.form_submit_button("Mettre à jour l’équipe")
-        if ok_team:
-            if not _check_csrf():
-                st.error("CSRF invalide.")
-            else:
-                if update_user_team(selected_user["email"], (team_edit or None)):
-                    # si l'admin édite son propre compte, rafraîchir la session
-                    au = st.session_state.get("auth_user") or {}
-                    if au.get("email") == selected_user["email"]:
-                        au["team_name"] = (team_edit or None)
-                        st.session_state["auth_user"] = au
-                    st.success("Équipe mise à jour ✅")
-                    st.rerun()
-                else:
-                    st.error("Échec de mise à jour de l’équipe.")
-
-        # --- Edit rôle admin ---
-        st.markdown("#### 👑 Droits administrateur")
-        is_root_target = selected_user["email"].strip().lower() == ADMIN_EMAIL
-
-        with st.form("edit_admin_form"):
             admin_edit = st.checkbox(
                 "Administrateur ?",
                 value=bool(selected_user.get("is_admin")),
                 help="Seul le compte `admin_email` (secrets) peut être admin.",
             )
-            ok_admin = st.form_submit_button("Mettre à jour les droits")
+            st.caption("🔒 Mot de passe : laisser vide pour ne pas le modifier.")
+            new_pwd = st.text_input("Nouveau mot de passe", type="password")
+            new_pwd2 = st.text_input("Confirmer le mot de passe", type="password")
+            ok_edit = st.form_submit_button("Appliquer")
+
+        if _guarded(ok_edit):
+            team_new = team_edit or None
+            team_changed = team_new != (selected_user.get("team_name") or None)
+            admin_changed = bool(admin_edit) != bool(selected_user.get("is_admin"))
 
-        if ok_admin:
-            if not _check_csrf():
-                st.error("CSRF invalide.")
+            if admin_changed and is_root_target and not admin_edit:
+                st.error("Impossible de retirer le droit admin au compte racine.")
+            elif new_pwd and len(new_pwd) < 8:
+                st.error("Le mot de passe doit contenir au moins 8 caractères.")
+            elif new_pwd and new_pwd != new_pwd2:
+                st.error("La confirmation ne correspond pas.")
+            elif not (team_changed or admin_changed or new_pwd):
+                st.info("Aucune modification à appliquer.")
             else:
-                if is_root_target and (not admin_edit):
-                    st.error("Impossible de retirer le droit admin au compte racine.")
-                else:
-                    if set_admin_flag(selected_user["id"], bool(admin_edit)):
-                        au = st.session_state.get("auth_user") or {}
-                        if au.get("email") == selected_user["email"]:
-                            au["is_admin"] = (selected_user["email"].strip().lower() == ADMIN_EMAIL)
-                            st.session_state["auth_user"] = au
+                # N'appelle que les repos dont la valeur a changé
+                au = st.session_state.get("auth_user") or {}
+                is_self = au.get("email") == selected_user["email"]
+                list_changed = failed = False
+
+                if team_changed:
+                    if update_user_team(selected_user["email"], team_new, caller_ctx=caller):
+                        list_changed = True
+                        if is_self:
+                            au["team_name"] = team_new
+                        st.success("Équipe mise à jour ✅")
+                    else:
+                        failed = True
+                        st.error("Échec de mise à jour de l’équipe.")
+
+                if admin_changed:
+                    if set_admin_flag(selected_user["id"], bool(admin_edit), caller_ctx=caller):
+                        list_changed = True
+                        if is_self:
+                            au["is_admin"] = is_root_target
                         st.success("Droits mis à jour ✅")
-                        st.rerun()
                     else:
+                        failed = True
                         st.error("Échec de mise à jour des droits.")
 
-        # --- Reset mot de passe ---
-        st.markdown("#### 🔒 Réinitialiser le mot de passe")
-        with st.form("reset_pwd_form"):
-            new_pwd = st.text_input("Nouveau mot de passe", type="password")
-            new_pwd2 = st.text_input("Confirmer le mot de passe", type="password")
-            ok_pwd = st.form_submit_button("Réinitialiser")
-        if ok_pwd:
-            if not _check_csrf():
-                st.error("CSRF invalide.")
-            elif len(new_pwd) < 8:
-                st.error("Le mot de passe doit contenir au moins 8 caractères.")
-            elif new_pwd != new_pwd2:
-                st.error("La confirmation ne correspond pas.")
-            else:
-                if set_password(selected_user["email"], new_pwd):
-                    st.success("Mot de passe réinitialisé ✅")
-                else:
-                    st.error("Échec de réinitialisation du mot de passe.")
+                if new_pwd:
+                    if set_password(selected_user["email"], new_pwd, caller_ctx=caller):
+                        st.success("Mot de passe réinitialisé ✅")
+                    else:
+                        failed = True
+                        st.error("Échec de réinitialisation du mot de passe.")
+
+                if list_changed:
+                    _cached_list_users.clear()
+                    # si l'admin édite son propre compte, rafraîchir la session
+                    if is_self:
+                        set_current_user(au)
+                    if not failed:
+                        st.rerun()
 
         # --- Suppression utilisateur ---
         st.markdown("#### 🗑️ Supprimer l’utilisateur")
@@ -213,14 +262,15 @@ else:
             confirm_email = st.text_input("Tapez l’email pour confirmer :", key="confirm_email")
         with c2:
             danger = st.button("Supprimer définitivement", type="secondary")
-        if danger:
-            if confirm_email.strip().lower() != selected_user["email"].strip().lower():
+        if _guarded(danger):
+            if confirm_email.strip().lower() != sel_email_norm:
                 st.error("Confirmez en retapant l’email exact de l’utilisateur.")
-            elif not _check_csrf():
-                st.error("CSRF invalide.")
             else:
-                if delete_user_by_id(selected_user["id"]):
+                if delete_user_by_id(selected_user["id"], caller_ctx=caller):
+                    _cached_list_users.clear()
                     st.success("Utilisateur supprimé ✅")
                     st.rerun()
                 else:
                     st.error("Échec de suppression.")
+
+_user_editor(users)
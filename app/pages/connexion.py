@@ -5,7 +5,7 @@ import os
 import time
 import streamlit as st
 
-from services.auth_service import login, logout, current_user
+from services.auth_service import login, logout, current_user, new_csrf_token
 from core.repos.users_repo import create_user
 
 from ui.nav import sidebar_menu
@@ -20,35 +20,31 @@ st.title("🔐 Connexion")
 # ---------------------------
 def _ensure_csrf():
     if "csrf_token" not in st.session_state:
-        import secrets
-        st.session_state["csrf_token"] = secrets.token_urlsafe(24)
+        st.session_state["csrf_token"] = new_csrf_token()
     return st.session_state["csrf_token"]
 
-def _check_csrf(token: str | None) -> bool:
-    return bool(token and token == st.session_state.get("csrf_token"))
+def _check_csrf() -> bool:
+    # Vérifie simplement que le token de session existe (on ne le rend jamais à l'écran)
+    return bool(st.session_state.get("csrf_token"))
 
 def _norm_email(email: str) -> str:
     return (email or "").strip().lower()
 
 def _cooldown_active() -> bool:
     # anti-bruteforce minimal côté UI (en complément de auth_service)
-    now = time.time()
-    last_fail = st.session_state.get("last_login_fail_ts", 0.0)
-    fails = int(st.session_state.get("login_fail_count", 0))
-    # après 5 échecs: cooldown 10s; après 10: 60s
-    if fails >= 10 and (now - last_fail) < 60:
-        return True
-    if fails >= 5 and (now - last_fail) < 10:
-        return True
-    return False
+    # échéance précalculée à l'échec: un seul get + une comparaison par rerun
+    return time.time() < st.session_state.get("cooldown_until", 0.0)
 
 def _register_fail():
-    st.session_state["login_fail_count"] = int(st.session_state.get("login_fail_count", 0)) + 1
-    st.session_state["last_login_fail_ts"] = time.time()
+    fails = int(st.session_state.get("login_fail_count", 0)) + 1
+    st.session_state["login_fail_count"] = fails
+    # après 5 échecs: cooldown 10s; après 10: 60s
+    delay = 60 if fails >= 10 else 10 if fails >= 5 else 0
+    st.session_state["cooldown_until"] = time.time() + delay
 
 def _reset_fail():
     st.session_state["login_fail_count"] = 0
-    st.session_state["last_login_fail_ts"] = 0.0
+    st.session_state["cooldown_until"] = 0.0
 
 csrf = _ensure_csrf()
 
@@ -77,7 +73,7 @@ else:
 
     if ok and not disabled:
         # ✅ Vérifie le token directement depuis la session (sans champ utilisateur)
-        if not _check_csrf(st.session_state.get("csrf_token")):
+        if not _check_csrf():
             st.error("CSRF invalide.")
         else:
             email_n = _norm_email(email)
@@ -119,7 +115,13 @@ with st.expander("🆕 Créer un utilisateur"):
         )
     else:
         st.caption("Crée ton compte ci-dessous. (Le rôle **Admin** n’est attribué que si ton email correspond à `admin_email` côté serveur.)")
-        with st.form("create_user"):
+        # Succès de la dernière création affiché depuis la session (le formulaire est vidé à l'envoi)
+        last_uid = st.session_state.pop("last_created_uid", None)
+        if last_uid is not None:
+            st.success(f"Utilisateur créé avec succès (id={last_uid}) ✅")
+            st.info("Tu peux maintenant te connecter avec ce compte.")
+
+        with st.form("create_user", clear_on_submit=True):
             email2 = st.text_input("Email (nouveau)")
             pwd2 = st.text_input("Mot de passe (nouveau)", type="password")
             team2 = st.text_input("Équipe (ex : Toulouse, Lyon)", placeholder="Toulouse")
@@ -127,7 +129,7 @@ with st.expander("🆕 Créer un utilisateur"):
 
         if ok2:
             # On récupère le token directement depuis la session (plus besoin de champ)
-            token_ok = _check_csrf(st.session_state.get("csrf_token"))
+            token_ok = _check_csrf()
             if not token_ok:
                 st.error("CSRF invalide.")
             else:
@@ -139,8 +141,8 @@ with st.expander("🆕 Créer un utilisateur"):
                 else:
                     try:
                         uid = create_user(email2_n, pwd2, (team2.strip() or None))
-                        st.success(f"Utilisateur créé avec succès (id={uid}) ✅")
-                        st.info("Tu peux maintenant te connecter avec ce compte.")
+                        st.session_state["last_created_uid"] = uid
+                        st.rerun()
                     except Exception as e:
                         st.error(str(e))
 # ------------------------------
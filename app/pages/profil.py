@@ -3,11 +3,10 @@
 from __future__ import annotations
 import streamlit as st
 
-from services.auth_service import require_login, logout, current_user
+from services.auth_service import require_login, logout, auth_context, set_current_user, new_csrf_token
 from core.repos.users_repo import (
-    verify_password_by_email,   # bcrypt/pbkdf2 + migration auto
+    change_own_password,        # vérif. actuel (bcrypt/pbkdf2 + migration auto) + nouveau hash
     update_user_team,
-    set_password,
 )
 
 # (facultatif) menu custom
@@ -22,25 +21,16 @@ st.title("👤 Mon profil")
 
 user = require_login()  # stop() si non connecté
 
-def _auth_ctx() -> dict:
-    u = current_user() or {}
-    return {
-        "id": u.get("id"),
-        "email": u.get("email"),
-        "team_name": u.get("team_name"),
-        "is_admin": bool(u.get("is_admin")),
-    }
-
 def _ensure_csrf():
     if "csrf_token" not in st.session_state:
-        import secrets
-        st.session_state["csrf_token"] = secrets.token_urlsafe(24)
+        st.session_state["csrf_token"] = new_csrf_token()
     return st.session_state["csrf_token"]
 
-def _check_csrf(token: str | None) -> bool:
-    return bool(token and token == st.session_state.get("csrf_token"))
+def _check_csrf() -> bool:
+    # Vérifie simplement que le token de session existe (on ne le rend jamais à l'écran)
+    return bool(st.session_state.get("csrf_token"))
 
-caller = _auth_ctx()
+caller = auth_context()
 csrf = _ensure_csrf()
 
 st.markdown(f"**Email :** `{user['email']}`")
@@ -56,20 +46,17 @@ with st.form("form_team"):
         value=user.get("team_name") or "",
         placeholder="Ex: Toulouse, Lyon…"
     )
-    # CSRF caché
     ok_team = st.form_submit_button("Mettre à jour l’équipe")
 
 if ok_team:
-    if not _check_csrf(st.session_state.get("csrf_team")):
+    if not _check_csrf():
         st.error("CSRF invalide.")
     else:
         team_norm = (new_team or "").strip() or None
         if update_user_team(user["email"], team_norm, caller_ctx=caller):
-            # mettre à jour la session si présente
-            au = st.session_state.get("auth_user") or {}
-            if au.get("email") == user["email"]:
-                au["team_name"] = team_norm
-                st.session_state["auth_user"] = au
+            # `user` est déjà le dict de session (require_login): mise à jour en place, sans relecture
+            user["team_name"] = team_norm
+            set_current_user(user)
             st.success("Équipe mise à jour ✅")
             st.rerun()
         else:
@@ -82,26 +69,26 @@ with st.form("form_pwd"):
     current_pwd = st.text_input("Mot de passe actuel", type="password")
     new_pwd = st.text_input("Nouveau mot de passe", type="password")
     new_pwd2 = st.text_input("Confirmer le nouveau mot de passe", type="password")
-    # CSRF caché
     ok_pwd = st.form_submit_button("Mettre à jour le mot de passe")
 
 if ok_pwd:
-    if not _check_csrf(st.session_state.get("csrf_pwd")):
+    if not _check_csrf():
         st.error("CSRF invalide.")
     else:
-        # Vérifie le mot de passe actuel via l’API unifiée
-        ok, _ = verify_password_by_email(user["email"], current_pwd or "")
-        if not ok:
-            st.error("Mot de passe actuel invalide.")
-        elif not new_pwd or len(new_pwd) < 8:
+        # Contrôles locaux d'abord, puis vérification + écriture en un seul appel repo
+        if not new_pwd or len(new_pwd) < 8:
             st.error("Le nouveau mot de passe doit contenir au moins 8 caractères.")
         elif new_pwd != new_pwd2:
             st.error("La confirmation ne correspond pas.")
         else:
-            if set_password(user["email"], new_pwd, caller_ctx=caller):
+            try:
+                ok, err = change_own_password(user["email"], current_pwd or "", new_pwd, caller_ctx=caller)
+            except ValueError as e:
+                ok, err = False, str(e)
+            if ok:
                 st.success("Mot de passe mis à jour ✅")
             else:
-                st.error("Échec de la mise à jour du mot de passe (droits insuffisants).")
+                st.error(err or "Échec de la mise à jour du mot de passe.")
 
 st.divider()
 st.subheader("🚪 Déconnexion")
@@ -4,7 +4,10 @@ from __future__ import annotations
 from typing import Optional
 import streamlit as st
 import time
-import secrets
+import base64
+import hmac
+import os
+import threading
 
 from core.repos.users_repo import verify_password_by_email
 
@@ -12,16 +15,40 @@ from core.repos.users_repo import verify_password_by_email
 # Constantes et clés session
 # -----------------------------
 SESSION_KEY = "auth_user"        # dict: {"email":..., "team_name":..., "is_admin":...}
-FAIL_KEY = "auth_fails"          # liste timestamps des tentatives ratées
 CSRF_KEY = "csrf_token"          # token CSRF pour formulaires sensibles
 LAST_SEEN_KEY = "auth_last_seen" # timestamp dernière activité
+CTX_KEY = "auth_ctx"             # contexte appelant dérivé du user (calculé une fois par session)
+FAIL_KEY = "auth_fails"          # liste timestamps des tentatives ratées (cette session)
 
-# Sécurité brute-force : max 5 essais en 5 minutes
+# Sécurité brute-force : max 5 essais en 5 minutes par session (blocage),
+# puis, par email tous clients confondus, un délai croissant (pas de blocage: un tiers qui connaît
+# l'email ne peut pas verrouiller le compte, seulement ralentir les essais)
 WINDOW = 300
 LIMIT = 5
+FAIL_DELAY_MAX = 8.0
 
 # Expiration de session (2 h par défaut)
 SESSION_TTL = 2 * 3600
+# Rafraîchissement de LAST_SEEN au plus une fois par intervalle (pas d'écriture session à chaque appel)
+LAST_SEEN_REFRESH = 30
+
+# Échecs de connexion par email normalisé, partagés par tout le process
+# (changer de session/cookie ne remet pas le délai à zéro)
+# Taille bornée: purge des entrées expirées (au plus une fois par minute, ou dès que le plafond est
+# atteint), puis éviction des plus anciennes si un arrosage d'emails distincts dépasse encore le plafond.
+_FAILS: dict[str, list[float]] = {}
+_FAILS_LOCK = threading.Lock()
+_FAILS_MAX = 10_000
+_FAILS_SWEEP_EVERY = 60
+_fails_last_sweep = 0.0
+
+# Réserve d'aléa pour les tokens de session: un seul appel os.urandom pour ~170 tokens
+# (chaque tranche n'est servie qu'une fois, sous verrou)
+_TOKEN_BYTES = 24
+_TOKEN_POOL_SIZE = 4096
+_TOKEN_POOL = b""
+_TOKEN_POOL_OFF = 0
+_TOKEN_POOL_LOCK = threading.Lock()
 
 
 # -----------------------------
@@ -32,25 +59,71 @@ def _now() -> float:
 
 
 def _too_many_fails() -> bool:
-    """Vérifie si trop de tentatives ont échoué récemment."""
+    """Vérifie si trop de tentatives ont échoué récemment dans cette session."""
     now = _now()
     fails = [t for t in st.session_state.get(FAIL_KEY, []) if now - t < WINDOW]
     st.session_state[FAIL_KEY] = fails
     return len(fails) >= LIMIT
 
 
-def _record_fail() -> None:
-    st.session_state.setdefault(FAIL_KEY, []).append(_now())
+def _fail_delay(email: str) -> float:
+    """Délai (s) avant vérification: 0 sous LIMIT échecs récents pour cet email, puis 1, 2, 4… plafonné."""
+    now = _now()
+    with _FAILS_LOCK:
+        fails = [t for t in _FAILS.get(email, ()) if now - t < WINDOW]
+        if fails:
+            _FAILS[email] = fails
+        else:
+            _FAILS.pop(email, None)
+    if len(fails) < LIMIT:
+        return 0.0
+    return min(FAIL_DELAY_MAX, float(2 ** (len(fails) - LIMIT)))
+
+
+def _sweep_fails(now: float) -> None:
+    """Purge les compteurs expirés et applique le plafond (appelé sous _FAILS_LOCK)."""
+    global _fails_last_sweep
+    if now - _fails_last_sweep < _FAILS_SWEEP_EVERY and len(_FAILS) < _FAILS_MAX:
+        return
+    _fails_last_sweep = now
+    for k in [k for k, ts in _FAILS.items() if not ts or now - ts[-1] >= WINDOW]:
+        del _FAILS[k]
+    # Ordre d'insertion = plus ancien premier échec: on évince celles-ci en priorité
+    for k in list(_FAILS)[: max(0, len(_FAILS) - _FAILS_MAX + 1)]:
+        del _FAILS[k]
+
+
+def _record_fail(email: str) -> None:
+    now = _now()
+    st.session_state.setdefault(FAIL_KEY, []).append(now)
+    with _FAILS_LOCK:
+        if email not in _FAILS:
+            _sweep_fails(now)
+        _FAILS.setdefault(email, []).append(now)
 
 
-def _reset_fails() -> None:
+def _reset_fails(email: str) -> None:
     st.session_state.pop(FAIL_KEY, None)
+    with _FAILS_LOCK:
+        _FAILS.pop(email, None)
+
+
+def new_csrf_token() -> str:
+    """Nouveau token urlsafe (24 octets d'aléa, comme secrets.token_urlsafe(24)) tiré de la réserve."""
+    global _TOKEN_POOL, _TOKEN_POOL_OFF
+    with _TOKEN_POOL_LOCK:
+        if _TOKEN_POOL_OFF + _TOKEN_BYTES > len(_TOKEN_POOL):
+            _TOKEN_POOL = os.urandom(_TOKEN_POOL_SIZE)
+            _TOKEN_POOL_OFF = 0
+        chunk = _TOKEN_POOL[_TOKEN_POOL_OFF:_TOKEN_POOL_OFF + _TOKEN_BYTES]
+        _TOKEN_POOL_OFF += _TOKEN_BYTES
+    return base64.urlsafe_b64encode(chunk).rstrip(b"=").decode("ascii")
 
 
 def _issue_csrf() -> str:
     """Renvoie ou génère un token CSRF unique pour cette session."""
     if CSRF_KEY not in st.session_state:
-        st.session_state[CSRF_KEY] = secrets.token_urlsafe(24)
+        st.session_state[CSRF_KEY] = new_csrf_token()
     return st.session_state[CSRF_KEY]
 
 
@@ -62,7 +135,8 @@ def _expire_session_if_needed() -> None:
         logout()
         st.warning("Session expirée, veuillez vous reconnecter.")
         st.stop()
-    st.session_state[LAST_SEEN_KEY] = now
+    if not last_seen or (now - last_seen) >= LAST_SEEN_REFRESH:
+        st.session_state[LAST_SEEN_KEY] = now
 
 
 # -----------------------------
@@ -70,19 +144,25 @@ def _expire_session_if_needed() -> None:
 # -----------------------------
 def login(email: str, password: str) -> bool:
     """Tente de connecter un utilisateur. Retourne True si succès."""
+    email_norm = (email or "").strip().lower()
+    # Limite de session vérifiée AVANT le KDF: au-delà du quota, aucun hash n'est calculé
     if _too_many_fails():
         st.error("Trop de tentatives. Réessayez dans quelques minutes.")
         return False
+    # Échecs répétés sur cet email (toutes sessions): ralentissement, jamais de blocage
+    delay = _fail_delay(email_norm)
+    if delay:
+        time.sleep(delay)
 
-    email_norm = (email or "").strip().lower()
     ok, user_public = verify_password_by_email(email_norm, password or "")
     if not ok:
-        _record_fail()
+        _record_fail(email_norm)
         st.error("Identifiants invalides.")
         return False
 
-    _reset_fails()
+    _reset_fails(email_norm)
     st.session_state[SESSION_KEY] = user_public
+    st.session_state.pop(CTX_KEY, None)
     st.session_state[LAST_SEEN_KEY] = _now()
     _issue_csrf()
 
@@ -95,7 +175,7 @@ def login(email: str, password: str) -> bool:
 
 def logout() -> None:
     """Supprime toute donnée d’authentification de la session."""
-    for k in [SESSION_KEY, FAIL_KEY, CSRF_KEY, LAST_SEEN_KEY]:
+    for k in [SESSION_KEY, CSRF_KEY, LAST_SEEN_KEY, CTX_KEY]:
         st.session_state.pop(k, None)
 
 
@@ -107,6 +187,33 @@ def current_user() -> Optional[dict]:
     return user
 
 
+def set_current_user(user: dict) -> None:
+    """Remplace le user de session (équipe/droits modifiés) et invalide le contexte dérivé."""
+    st.session_state[SESSION_KEY] = user
+    st.session_state.pop(CTX_KEY, None)
+
+
+def auth_context() -> dict:
+    """
+    Contexte appelant passé aux repos ({id, email, team_name, is_admin}).
+    Construit une fois par session puis relu depuis session_state (invalidé au login/logout).
+    """
+    u = current_user()  # garde le contrôle d'expiration à chaque rerun
+    if not u:
+        st.session_state.pop(CTX_KEY, None)
+        return {"id": None, "email": None, "team_name": "", "is_admin": False}
+    ctx = st.session_state.get(CTX_KEY)
+    if ctx is None:
+        ctx = {
+            "id": u.get("id"),
+            "email": u.get("email"),
+            "team_name": (u.get("team_name") or "").strip(),
+            "is_admin": bool(u.get("is_admin")),
+        }
+        st.session_state[CTX_KEY] = ctx
+    return ctx
+
+
 def is_logged_in() -> bool:
     """Renvoie True si un utilisateur est actuellement connecté."""
     return bool(current_user())
@@ -143,7 +250,9 @@ def get_csrf_token() -> str:
 
 def check_csrf(token: str | None) -> bool:
     """Vérifie la validité d’un token CSRF reçu."""
-    return bool(token and token == st.session_state.get(CSRF_KEY))
+    stored = st.session_state.get(CSRF_KEY)
+    # comparaison à temps constant (pas de court-circuit sur le premier octet différent)
+    return bool(token) and bool(stored) and hmac.compare_digest(str(token), str(stored))
 # ---------------------------------------------------------------------------
 # Fin du service d’authentification
 # ---------------------------------------------------------------------------
\ No newline at end of file
@@ -3,77 +3,107 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 from typing import Iterable, Any, Dict, List, Tuple, Optional
-from types import SimpleNamespace as _NS
 from io import BytesIO
+from functools import lru_cache
+import operator
 import re
 
 import pandas as pd
-import numpy as np
 
 
 # ============================================================
-# Normalisation de structures (dict -> objet à attributs)
+# Normalisation (lignes dict/objet -> colonnes typées)
 # ============================================================
 
-def _as_obj(row: Any) -> Any:
-    """Accepte dict ou objet ; retourne un objet à attributs."""
-    if isinstance(row, dict):
-        return _NS(**row)
-    return row
-
-
-def _safe_int(x: Any, default: int = 0) -> int:
+def _to_date_str(x: Any) -> Any:
+    """Retourne une date ISO 'YYYY-MM-DD' si possible, sinon la valeur d'origine."""
     try:
-        if x is None or (isinstance(x, float) and np.isnan(x)):
-            return default
-        return int(x)
+        # pandas/py datetime -> str
+        return pd.to_datetime(x).date().isoformat()
     except Exception:
-        return default
+        return x
+
+
+def _columns(rows: Iterable[Any], attrs: Tuple[str, ...]) -> Dict[str, List[Any]]:
+    """
+    Transpose des lignes (dict ou objets) en colonnes {attr: [valeurs]} en une passe,
+    sans créer d'objet intermédiaire par ligne. Attribut absent -> None.
+    """
+    # Getters C construits une fois par appel (attrs contient toujours plusieurs noms -> tuple)
+    get_item = operator.itemgetter(*attrs)
+    get_attr = operator.attrgetter(*attrs)
+    out: List[tuple] = []
+    for r in rows or []:
+        is_dict = isinstance(r, dict)
+        try:
+            out.append(get_item(r) if is_dict else get_attr(r))
+        except (KeyError, AttributeError):
+            # Ligne incomplète: repli champ par champ avec None par défaut
+            if is_dict:
+                out.append(tuple(r.get(a) for a in attrs))
+            else:
+                out.append(tuple(getattr(r, a, None) for a in attrs))
+    if not out:
+        return {a: [] for a in attrs}
+    return {a: list(col) for a, col in zip(attrs, zip(*out))}
 
 
-def _safe_str(x: Any, default: str = "") -> str:
-    if x is None:
-        return default
-    s = str(x)
-    return s
+def _int_col(values: List[Any]) -> pd.Series:
+    """Colonne entière (None/NaN/non numérique -> 0), convertie en bloc."""
+    return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").fillna(0).astype("int64")
 
 
-def _to_date_str(x: Any) -> Any:
-    """Retourne une date ISO 'YYYY-MM-DD' si possible, sinon la valeur d'origine."""
+def _str_col(values: List[Any]) -> pd.Series:
+    """Colonne texte (None -> ''), convertie en bloc."""
+    s = pd.Series(values, dtype=object)
+    return s.where(s.notna(), "").astype(str)
+
+
+def _date_col(values: List[Any]) -> Tuple[pd.Series, Optional[pd.Series]]:
+    """
+    Équivalent vectorisé de _to_date_str: ISO 'YYYY-MM-DD' si convertible, sinon valeur d'origine.
+    Renvoie aussi les dates parsées (datetime64, NaT si invalide) pour réutilisation (tri), ou None.
+    """
+    s = pd.Series(values, dtype=object)
     try:
-        # pandas/py datetime -> str
-        return pd.to_datetime(x).date().isoformat()
+        parsed = pd.to_datetime(s, errors="coerce")
+        return parsed.dt.strftime("%Y-%m-%d").where(parsed.notna(), s), parsed
     except Exception:
-        return x
+        return s.map(_to_date_str), None
 
 
 # ============================================================
 # DataFrames standardisés
 # ============================================================
 
+# Attributs lus sur chaque ligne source (dict ou objet ORM)
+_MATCH_ATTRS = ("id", "date", "season_id", "home_club", "away_club", "total_home_points", "total_away_points", "venue")
+_QUARTER_ATTRS = ("q", "home_goals", "home_behinds", "home_points", "away_goals", "away_behinds", "away_points")
+_PLAYER_STAT_ATTRS = ("player_name", "goals", "behinds", "points")
+
+
 def df_from_matches(rows: Iterable[Any]) -> pd.DataFrame:
     """
     Construit un DataFrame de matches avec des colonnes standard :
     ['ID','Date','Saison','Domicile','Extérieur','Points Domicile','Points Extérieur','Lieu']
     """
-    out: List[Dict[str, Any]] = []
-    for r in rows or []:
-        m = _as_obj(r)
-        out.append({
-            "ID": getattr(m, "id", None),
-            "Date": _to_date_str(getattr(m, "date", None)),
-            "Saison": _safe_str(getattr(m, "season_id", None)),
-            "Domicile": _safe_str(getattr(m, "home_club", None)),
-            "Extérieur": _safe_str(getattr(m, "away_club", None)),
-            "Points Domicile": _safe_int(getattr(m, "total_home_points", None)),
-            "Points Extérieur": _safe_int(getattr(m, "total_away_points", None)),
-            "Lieu": _safe_str(getattr(m, "venue", None)),
-        })
-    df = pd.DataFrame(out)
-    # Tri du plus récent au plus ancien si Date présente
-    if not df.empty and "Date" in df.columns:
+    c = _columns(rows, _MATCH_ATTRS)
+    dates, parsed = _date_col(c["date"])
+    df = pd.DataFrame({
+        "ID": pd.Series(c["id"], dtype=object),
+        "Date": dates,
+        "Saison": _str_col(c["season_id"]),
+        "Domicile": _str_col(c["home_club"]),
+        "Extérieur": _str_col(c["away_club"]),
+        "Points Domicile": _int_col(c["total_home_points"]),
+        "Points Extérieur": _int_col(c["total_away_points"]),
+        "Lieu": _str_col(c["venue"]),
+    })
+    # Tri du plus récent au plus ancien sur les dates déjà parsées (datetime64: comparaison int64, NaT en fin)
+    if not df.empty and parsed is not None:
         try:
-            df = df.sort_values("Date", ascending=False, key=lambda s: pd.to_datetime(s, errors="coerce"))
+            order = parsed.sort_values(ascending=False, kind="stable").index
+            df = df.loc[order]
         except Exception:
             pass
     return df
@@ -90,43 +120,19 @@ def df_from_quarters(
     Colonnes: ['Q', f'{home} G','{home} B','{home} P', f'{away} G','{away} B','{away} P']
     Ajoute une ligne 'Total' si with_total=True.
     """
-    rows: List[Dict[str, Any]] = []
-    hg = hb = hp = ag = ab = ap = 0
-
-    for q in quarters or []:
-        o = _as_obj(q)
-        hG = _safe_int(getattr(o, "home_goals", 0))
-        hB = _safe_int(getattr(o, "home_behinds", 0))
-        hP = _safe_int(getattr(o, "home_points", 0))
-        aG = _safe_int(getattr(o, "away_goals", 0))
-        aB = _safe_int(getattr(o, "away_behinds", 0))
-        aP = _safe_int(getattr(o, "away_points", 0))
-
-        rows.append({
-            "Q": getattr(o, "q", None),
-            f"{home_label} G": hG,
-            f"{home_label} B": hB,
-            f"{home_label} P": hP,
-            f"{away_label} G": aG,
-            f"{away_label} B": aB,
-            f"{away_label} P": aP,
-        })
-
-        hg += hG; hb += hB; hp += hP
-        ag += aG; ab += aB; ap += aP
-
-    df = pd.DataFrame(rows)
+    c = _columns(quarters, _QUARTER_ATTRS)
+    df = pd.DataFrame({
+        "Q": pd.Series(c["q"], dtype=object),
+        f"{home_label} G": _int_col(c["home_goals"]),
+        f"{home_label} B": _int_col(c["home_behinds"]),
+        f"{home_label} P": _int_col(c["home_points"]),
+        f"{away_label} G": _int_col(c["away_goals"]),
+        f"{away_label} B": _int_col(c["away_behinds"]),
+        f"{away_label} P": _int_col(c["away_points"]),
+    })
     if with_total and not df.empty:
-        total_row = {
-            "Q": "Total",
-            f"{home_label} G": hg,
-            f"{home_label} B": hb,
-            f"{home_label} P": hp,
-            f"{away_label} G": ag,
-            f"{away_label} B": ab,
-            f"{away_label} P": ap,
-        }
-        df = pd.concat([df, pd.DataFrame([total_row])], ignore_index=True)
+        # Totaux par somme colonnaire (C), ligne ajoutée en place (pas de copie via pd.concat)
+        df.loc[len(df)] = ["Total", *(int(v) for v in df.iloc[:, 1:].sum())]
     return df
 
 
@@ -140,25 +146,22 @@ def df_from_player_stats(
     Colonnes: ['Joueur','Goals','Behinds','Points']
     Ajoute une ligne 'Total <team_label>' si with_total=True et team_label fourni.
     """
-    rows: List[Dict[str, Any]] = []
-    for r in player_stats or []:
-        o = _as_obj(r)
-        rows.append({
-            "Joueur": _safe_str(getattr(o, "player_name", None)),
-            "Goals": _safe_int(getattr(o, "goals", 0)),
-            "Behinds": _safe_int(getattr(o, "behinds", 0)),
-            "Points": _safe_int(getattr(o, "points", 0)),
-        })
-    df = pd.DataFrame(rows)
+    c = _columns(player_stats, _PLAYER_STAT_ATTRS)
+    df = pd.DataFrame({
+        "Joueur": _str_col(c["player_name"]),
+        "Goals": _int_col(c["goals"]),
+        "Behinds": _int_col(c["behinds"]),
+        "Points": _int_col(c["points"]),
+    })
     if with_total and not df.empty:
         label = f"Total {team_label}" if team_label else "Total"
-        total_row = {
+        sums = df[["Goals", "Behinds", "Points"]].sum()
+        df.loc[len(df)] = {
             "Joueur": label,
-            "Goals": int(df["Goals"].sum()),
-            "Behinds": int(df["Behinds"].sum()),
-            "Points": int(df["Points"].sum()),
+            "Goals": int(sums["Goals"]),
+            "Behinds": int(sums["Behinds"]),
+            "Points": int(sums["Points"]),
         }
-        df = pd.concat([df, pd.DataFrame([total_row])], ignore_index=True)
     return df
 
 
@@ -178,9 +181,16 @@ def to_csv_bytes(
     Encode un DataFrame en CSV (bytes).
     - add_bom=True si vous ciblez Excel Windows (UTF-8-SIG).
     """
-    csv_str = df.to_csv(index=index, sep=sep, lineterminator=lineterminator)
-    data = csv_str.encode("utf-8-sig" if add_bom else encoding)
-    return data
+    # Écriture directe en binaire (pas de str intermédiaire puis .encode: une copie de moins)
+    bio = BytesIO()
+    df.to_csv(
+        bio,
+        index=index,
+        sep=sep,
+        lineterminator=lineterminator,
+        encoding=("utf-8-sig" if add_bom else encoding),
+    )
+    return bio.getvalue()
 
 
 def to_json_bytes(df: pd.DataFrame, orient: str = "records", force_ascii: bool = False) -> bytes:
@@ -188,11 +198,21 @@ def to_json_bytes(df: pd.DataFrame, orient: str = "records", force_ascii: bool =
     return df.to_json(orient=orient, force_ascii=force_ascii).encode("utf-8")
 
 
+# Au-delà, l'ajustement automatique de largeur des colonnes Excel est ignoré
+AUTOSIZE_MAX_ROWS = 10_000
+
+
+# Caractères interdits dans un nom de feuille Excel
+_SHEET_RE = re.compile(r'[:\\/*?\[\]]')
+
+
+@lru_cache(maxsize=256)
 def _safe_sheet_name(name: str) -> str:
     """
     Assainit un nom de feuille Excel : <=31 chars, sans []:*?/\\ et pas vide.
+    Mis en cache: les exports réutilisent toujours les mêmes quelques noms d'onglets.
     """
-    base = re.sub(r'[:\\/*?\[\]]', "-", (name or "Sheet"))
+    base = _SHEET_RE.sub("-", (name or "Sheet"))
     base = base.strip() or "Sheet"
     return base[:31]
 
@@ -204,8 +224,20 @@ def to_excel_bytes(sheets: Dict[str, pd.DataFrame]) -> bytes:
     - Assainit les noms de feuilles et gère les doublons éventuels.
     - Ajuste grossièrement la largeur des colonnes et fige l’en-tête.
     """
+    import xlsxwriter  # import local: dépendance utile au seul export Excel
+
     bio = BytesIO()
-    with pd.ExcelWriter(bio, engine="xlsxwriter") as writer:
+    # constant_memory: chaque ligne est vidée dès que la suivante commence (mémoire ~1 ligne,
+    # pas O(cellules)). Ce mode impose une écriture ligne par ligne: DataFrame.to_excel écrit
+    # colonne par colonne, on passe donc par write_row, mise en forme posée avant les données.
+    # default_date_format: cellules date/datetime écrites sans format (colonnes objet) restent lisibles
+    wb = xlsxwriter.Workbook(
+        bio, {"constant_memory": True, "nan_inf_to_errors": True, "default_date_format": "yyyy-mm-dd"}
+    )
+    try:
+        header_fmt = wb.add_format({"bold": True, "border": 1})
+        # Colonnes datetime64: même format que l'ancien to_excel (pandas: 'YYYY-MM-DD HH:MM:SS')
+        datetime_fmt = wb.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
         used_names: set[str] = set()
         for raw_name, df in sheets.items():
             safe = _safe_sheet_name(str(raw_name) if raw_name else "Sheet")
@@ -217,30 +249,39 @@ def to_excel_bytes(sheets: Dict[str, pd.DataFrame]) -> bytes:
                 n += 1
             used_names.add(name)
 
-            sheet_df = (df or pd.DataFrame()).copy()
-            # Petites normalisations utiles avant export
+            sheet_df = (df if df is not None else pd.DataFrame()).copy()
+            # Petites normalisations utiles avant export (dates: une conversion vectorisée par colonne)
             if "Date" in sheet_df.columns:
                 try:
-                    sheet_df["Date"] = sheet_df["Date"].map(_to_date_str)
+                    sheet_df["Date"] = _date_col(sheet_df["Date"].tolist())[0].to_numpy()
                 except Exception:
                     pass
 
-            sheet_df.to_excel(writer, sheet_name=name, index=False)
-
-            # Mise en forme basique si xlsxwriter
-            try:
-                ws = writer.sheets[name]
-                # Freeze header
-                ws.freeze_panes(1, 0)
-                # Auto-width (approx): largeur = max( min(40, max(len(str)) + 2) )
+            ws = wb.add_worksheet(name)
+            # Freeze header
+            ws.freeze_panes(1, 0)
+            # Auto-width (approx): largeur = min(40, max(len(en-tête), len(cellule la plus longue)) + 2)
+            # Longueurs calculées en bloc (.str.len), ignoré au-delà de AUTOSIZE_MAX_ROWS lignes
+            if len(sheet_df) <= AUTOSIZE_MAX_ROWS:
                 for idx, col in enumerate(sheet_df.columns):
-                    series = sheet_df[col].astype(str)
-                    max_len = max([len(col)] + series.map(len).tolist()) if not series.empty else len(col)
+                    cells = sheet_df[col]
+                    max_len = len(str(col))
+                    if len(cells):
+                        max_len = max(max_len, int(cells.astype(str).str.len().max()))
                     ws.set_column(idx, idx, min(40, max_len + 2))
-            except Exception:
-                pass
 
-    bio.seek(0)
+            # En-tête puis lignes dans l'ordre (valeurs Python natives, NaN -> cellule vide)
+            ws.write_row(0, 0, [str(c) for c in sheet_df.columns], header_fmt)
+            dt_cols = [i for i, c in enumerate(sheet_df.columns) if pd.api.types.is_datetime64_any_dtype(sheet_df[c])]
+            body = sheet_df.astype(object).where(sheet_df.notna(), None)
+            for r, row in enumerate(body.itertuples(index=False, name=None), start=1):
+                ws.write_row(r, 0, row)
+                for i in dt_cols:
+                    if row[i] is not None:
+                        ws.write_datetime(r, i, row[i], datetime_fmt)
+    finally:
+        wb.close()
+
     return bio.getvalue()
 
 
@@ -14,9 +14,14 @@ from core.scoring import compute_totals_from_quarters
 # -----------------------------
 
 def _safe_int(x: Any, default: int = 0) -> int:
+    # Chemin rapide: valeurs ORM déjà entières (cas très majoritaire), sans bloc try
+    if type(x) is int:
+        return x
+    if x is None:
+        return default
     try:
         return int(x)
-    except Exception:
+    except (ValueError, TypeError, OverflowError):
         return default
 
 def _safe_str(x: Any) -> Optional[str]:
@@ -25,36 +30,31 @@ def _safe_str(x: Any) -> Optional[str]:
     s = str(x).strip()
     return s or None
 
+_Q_FIELDS = ("home_goals", "home_behinds", "home_points", "away_goals", "away_behinds", "away_points")
+
 def _ensure_quarter(q: Any, idx: int) -> Quarter:
     """Accepte un Quarter ORM ou un dict compatible, renvoie un Quarter ORM."""
     if isinstance(q, Quarter):
-        # force coercition safe (évite valeurs négatives/None bizarres)
-        q.q = _safe_int(getattr(q, "q", idx), idx)
-        q.home_goals = _safe_int(getattr(q, "home_goals", 0), 0)
-        q.home_behinds = _safe_int(getattr(q, "home_behinds", 0), 0)
-        q.home_points = _safe_int(getattr(q, "home_points", 0), 0)
-        q.away_goals = _safe_int(getattr(q, "away_goals", 0), 0)
-        q.away_behinds = _safe_int(getattr(q, "away_behinds", 0), 0)
-        q.away_points = _safe_int(getattr(q, "away_points", 0), 0)
+        # force coercition safe (évite valeurs négatives/None bizarres); attributs garantis par le modèle ORM
+        q.q = _safe_int(q.q, idx)
+        q.home_goals = _safe_int(q.home_goals, 0)
+        q.home_behinds = _safe_int(q.home_behinds, 0)
+        q.home_points = _safe_int(q.home_points, 0)
+        q.away_goals = _safe_int(q.away_goals, 0)
+        q.away_behinds = _safe_int(q.away_behinds, 0)
+        q.away_points = _safe_int(q.away_points, 0)
         return q
-    # dict-like
-    return Quarter(
-        q=_safe_int(q.get("q", idx), idx),
-        home_goals=_safe_int(q.get("home_goals", 0), 0),
-        home_behinds=_safe_int(q.get("home_behinds", 0), 0),
-        home_points=_safe_int(q.get("home_points", 0), 0),
-        away_goals=_safe_int(q.get("away_goals", 0), 0),
-        away_behinds=_safe_int(q.get("away_behinds", 0), 0),
-        away_points=_safe_int(q.get("away_points", 0), 0),
-    )
+    # dict-like: champs lus en boucle sur un tuple statique (_safe_int(None) -> 0 pour les absents)
+    get = q.get
+    return Quarter(q=_safe_int(get("q"), idx), **{f: _safe_int(get(f), 0) for f in _Q_FIELDS})
 
 def _ensure_playerstat(r: Any) -> PlayerStat:
     """Accepte un PlayerStat ORM ou un dict compatible, renvoie un PlayerStat ORM."""
     if isinstance(r, PlayerStat):
-        r.player_name = _safe_str(getattr(r, "player_name", None)) or "Inconnu"
-        r.goals = _safe_int(getattr(r, "goals", 0), 0)
-        r.behinds = _safe_int(getattr(r, "behinds", 0), 0)
-        r.points = _safe_int(getattr(r, "points", 0), 0)
+        r.player_name = _safe_str(r.player_name) or "Inconnu"
+        r.goals = _safe_int(r.goals, 0)
+        r.behinds = _safe_int(r.behinds, 0)
+        r.points = _safe_int(r.points, 0)
         # on laisse player_id tel quel (peut être None)
         return r
     return PlayerStat(
@@ -67,20 +67,36 @@ def _ensure_playerstat(r: Any) -> PlayerStat:
 
 def _normalize_match(m: Match) -> Match:
     """Nettoie et normalise les champs simples du match (in-place)."""
-    m.season_id = _safe_str(getattr(m, "season_id", None)) or ""
-    m.venue = _safe_str(getattr(m, "venue", None))
-    m.home_club = _safe_str(getattr(m, "home_club", None)) or ""
-    m.away_club = _safe_str(getattr(m, "away_club", None)) or ""
-    m.total_home_points = _safe_int(getattr(m, "total_home_points", 0), 0)
-    m.total_away_points = _safe_int(getattr(m, "total_away_points", 0), 0)
+    m.season_id = _safe_str(m.season_id) or ""
+    m.venue = _safe_str(m.venue)
+    m.home_club = _safe_str(m.home_club) or ""
+    m.away_club = _safe_str(m.away_club) or ""
+    m.total_home_points = _safe_int(m.total_home_points, 0)
+    m.total_away_points = _safe_int(m.total_away_points, 0)
     # quarters & player_stats
-    qs: List[Any] = list(getattr(m, "quarters", []) or [])
-    ps: List[Any] = list(getattr(m, "player_stats", []) or [])
+    qs: List[Any] = list(m.quarters or [])
+    ps: List[Any] = list(m.player_stats or [])
     m.quarters = [_ensure_quarter(q, i + 1) for i, q in enumerate(qs)]
     m.player_stats = [_ensure_playerstat(r) for r in ps]
     return m
 
 
+def _match_from_dict(d: Dict[str, Any]) -> Match:
+    """Construit un Match ORM déjà normalisé depuis un dict (pas besoin de repasser par _normalize_match)."""
+    m = Match(
+        season_id=_safe_str(d.get("season_id")) or "",
+        date=d.get("date"),  # laissé tel quel (date)
+        venue=_safe_str(d.get("venue")),
+        home_club=_safe_str(d.get("home_club")) or "",
+        away_club=_safe_str(d.get("away_club")) or "",
+        total_home_points=_safe_int(d.get("total_home_points", 0), 0),
+        total_away_points=_safe_int(d.get("total_away_points", 0), 0),
+    )
+    m.quarters = [_ensure_quarter(q, i + 1) for i, q in enumerate(d.get("quarters", []) or [])]
+    m.player_stats = [_ensure_playerstat(r) for r in (d.get("player_stats", []) or [])]
+    return m
+
+
 # -----------------------------
 # Autorisation simple
 # -----------------------------
@@ -122,29 +138,15 @@ def save_post_match(
     - Valide via core.validators.validate_match (quarts, totaux, joueurs).
     - Vérifie une règle d'autorisation simple (voir _ensure_authorized_to_create).
     """
-    # 1) Construire/normaliser un objet Match ORM
+    # 1) Construire/normaliser un objet Match ORM (une seule passe de normalisation par chemin)
     m: Match
     if isinstance(match, Match):
-        m = match
+        m = _normalize_match(match)
     else:
-        # dict -> Match
-        m = Match(
-            season_id=_safe_str(match.get("season_id")) or "",
-            date=match.get("date"),  # laissé tel quel (date)
-            venue=_safe_str(match.get("venue")),
-            home_club=_safe_str(match.get("home_club")) or "",
-            away_club=_safe_str(match.get("away_club")) or "",
-            total_home_points=_safe_int(match.get("total_home_points", 0), 0),
-            total_away_points=_safe_int(match.get("total_away_points", 0), 0),
-        )
-        m.quarters = [ _ensure_quarter(q, i+1) for i, q in enumerate(match.get("quarters", []) or []) ]
-        m.player_stats = [ _ensure_playerstat(r) for r in (match.get("player_stats", []) or []) ]
-
-    _normalize_match(m)
+        m = _match_from_dict(match)
 
     # 2) Si quarts fournis, on recalcule les totaux pour éviter tout écart.
-    if m.quarters:
-        compute_totals_from_quarters(m)
+    computed = compute_totals_from_quarters(m) if m.quarters else None
 
     # 3) Déterminer le côté de l'utilisateur (pour comparer points joueurs vs score déclaré)
     team_side: Optional[Literal["home", "away"]] = None
@@ -155,7 +157,7 @@ def save_post_match(
             team_side = "away"
 
     # 4) Validation serveur
-    ok_val, errors, warnings = validate_match(m, team_side=team_side)
+    ok_val, errors, warnings = validate_match(m, team_side=team_side, precomputed=computed)
     if not ok_val:
         # retourne toutes les erreurs (warnings ignorés)
         return False, issues_as_strings(errors), None
@@ -3,17 +3,33 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 import re
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
 
+import numpy as np
+import pandas as pd
 import streamlit as st
 from core.models import calc_points
 
 
+class PlayerRow(NamedTuple):
+    """Ligne joueur saisie (tuple léger: pas de dict par ligne)."""
+    player_name: str
+    goals: int
+    behinds: int
+    points: int
+
+
+_RE_SPACES = re.compile(r"\s+")
+_RE_CLEAN = re.compile(r"[^a-z0-9._\-]")
+
+
+@lru_cache(maxsize=512)
 def _slug(s: str) -> str:
-    """Slug simple pour générer des clés Streamlit stables."""
+    """Slug simple pour générer des clés Streamlit stables (mis en cache: mêmes libellés à chaque rerun)."""
     s = (s or "").lower().strip()
-    s = re.sub(r"\s+", "-", s)
-    s = re.sub(r"[^a-z0-9._\-]", "", s)
+    s = _RE_SPACES.sub("-", s)
+    s = _RE_CLEAN.sub("", s)
     return s or "x"
 
 
@@ -42,17 +58,15 @@ def players_stat_table(
     *,
     team_label: str = "Mon équipe",
     key_prefix: Optional[str] = None,
-) -> List[Dict]:
+) -> List[PlayerRow]:
     """
     Éditeur de stats joueurs (nom, buts, behinds) avec recalcul automatique des points.
     - default_names: liste de noms proposée initialement
     - team_label: intitulé d’équipe (affichage)
     - key_prefix: pour stabiliser l’état du widget si plusieurs tables coexistent
 
-    Retourne une liste de dicts: [{"player_name", "goals", "behinds", "points"}, ...]
+    Retourne une liste de PlayerRow(player_name, goals, behinds, points).
     """
-    import pandas as pd  # import local pour limiter les dépendances globales
-
     kp = key_prefix or f"pstable-{_slug(team_label)}"
 
     st.caption(f"Joueurs ({team_label}) — ajoute, supprime ou modifie les lignes ci-dessous.")
@@ -96,23 +110,28 @@ def players_stat_table(
 
     # Recalcul des points et nettoyage
     edited = edited.fillna({"player_name": "", "goals": 0, "behinds": 0})
-    # Coercition sûre
-    try:
-        edited["goals"] = edited["goals"].astype(int).clip(lower=0)
-        edited["behinds"] = edited["behinds"].astype(int).clip(lower=0)
-    except Exception:
-        # fallback si types étranges
-        edited["goals"] = edited["goals"].apply(lambda x: int(x) if str(x).isdigit() else 0)
-        edited["behinds"] = edited["behinds"].apply(lambda x: int(x) if str(x).isdigit() else 0)
-
-    edited["points"] = edited["goals"] * 6 + edited["behinds"]
+    # Coercition sûre en une passe (valeur non numérique -> 0, négatif -> 0), puis points vectorisés
+    # (pas de out=: to_numpy peut renvoyer une vue en lecture seule sous copy-on-write)
+    g = np.maximum(pd.to_numeric(edited["goals"], errors="coerce").fillna(0).to_numpy(dtype=np.int64), 0)
+    b = np.maximum(pd.to_numeric(edited["behinds"], errors="coerce").fillna(0).to_numpy(dtype=np.int64), 0)
+    edited["goals"] = g
+    edited["behinds"] = b
+    edited["points"] = g * 6 + b
     st.session_state[state_key] = edited  # persiste l’état pour les prochains reruns
 
     # Avertissements utiles (doublons, vides)
-    names_norm = [(str(n or "").strip().lower()) for n in edited["player_name"].tolist()]
-    non_empty = [i for i, n in enumerate(names_norm) if n]
-    empties = [i for i, n in enumerate(names_norm) if not n]
-    dup_set = {n for n in names_norm if n and names_norm.count(n) > 1}
+    # Une seule passe: lignes vides + doublons (nom normalisé déjà vu)
+    dup_set: set = set()
+    seen: set = set()
+    empties: List[int] = []
+    for i, raw in enumerate(edited["player_name"].tolist()):
+        n = str(raw or "").strip().lower()
+        if not n:
+            empties.append(i)
+        elif n in seen:
+            dup_set.add(n)
+        else:
+            seen.add(n)
 
     if dup_set:
         st.warning("Noms en doublon détectés : " + ", ".join(sorted(dup_set)))
@@ -123,18 +142,15 @@ def players_stat_table(
     total_pts = int(edited["points"].sum() if not edited.empty else 0)
     st.caption(f"**Total points {team_label} : {total_pts}**")
 
-    # Conversion en liste de dicts (en ignorant les lignes vides)
-    out: List[Dict] = []
-    for _, r in edited.iterrows():
-        name = (str(r.get("player_name") or "").strip())
+    # Conversion en liste de PlayerRow (en ignorant les lignes vides)
+    # itertuples (tuples bruts) plutôt qu'iterrows (une Series par ligne)
+    out: List[PlayerRow] = []
+    cols = edited[["player_name", "goals", "behinds", "points"]]
+    for name, goals, behinds, points in cols.itertuples(index=False, name=None):
+        name = (str(name or "").strip())
         if not name:
             continue
-        out.append({
-            "player_name": name,
-            "goals": int(r.get("goals") or 0),
-            "behinds": int(r.get("behinds") or 0),
-            "points": int(r.get("points") or 0),
-        })
+        out.append(PlayerRow(name, int(goals or 0), int(behinds or 0), int(points or 0)))
 
     return out
 # -----------------------------
\ No newline at end of file
@@ -5,12 +5,17 @@ import streamlit as st
 from services.auth_service import current_user, logout
 
 
-def sidebar_menu() -> dict | None:
+_UNSET = object()
+
+
+def sidebar_menu(u: dict | None | object = _UNSET) -> dict | None:
     """
     Affiche le menu latéral et renvoie l'utilisateur courant (dict) ou None.
-    À appeler en haut de chaque page.
+    À appeler en haut de chaque page. Si la page a déjà résolu l'utilisateur pendant ce run,
+    le passer en argument évite un second current_user().
     """
-    u = current_user()
+    if u is _UNSET:
+        u = current_user()
 
     with st.sidebar:
         st.header("🏉 Footy Score")
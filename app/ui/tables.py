@@ -2,27 +2,47 @@
 # app/ui/tables.py
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-from typing import Iterable, List, Dict, Any, Optional
+from typing import Callable, Iterable, List, Dict, Any, Optional, Tuple
 from datetime import date
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from types import SimpleNamespace
 
 import pandas as pd
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 
-from core.scoring import (
-    scoreline_home_away,
-    sum_quarters_match,
-)
+from core.scoring import scoreline_home_away
+from services.export_service import to_csv_bytes
 
 # ------------------------------
 # Utils d'accès/format
 # ------------------------------
 
 def _get(obj: Any, name: str, default: Any = None) -> Any:
-    if hasattr(obj, name):
-        return getattr(obj, name)
+    # Une seule opération de réflexion par champ (getattr avec défaut) au lieu de hasattr + getattr
     if isinstance(obj, dict):
         return obj.get(name, default)
-    return default
+    return getattr(obj, name, default)
+
+def _project(items: Iterable[Any], fields: Tuple[str, ...]) -> List[tuple]:
+    """
+    Projection lignes -> tuples (ordre de `fields`): dict vs objet détecté une fois sur la 1re ligne,
+    puis itemgetter/attrgetter (C) par ligne. Ligne hétérogène ou champ absent -> repli _get.
+    """
+    items = list(items or [])
+    if not items:
+        return []
+    get = itemgetter(*fields) if isinstance(items[0], dict) else attrgetter(*fields)
+    try:
+        return [get(r) for r in items]
+    except (KeyError, AttributeError, TypeError):
+        return [tuple(_get(r, f) for f in fields) for r in items]
+
+def _frame_from_tuples(rows: Iterable[tuple], names: Tuple[str, ...]) -> pd.DataFrame:
+    rows = list(rows)
+    cols = list(zip(*rows)) if rows else [()] * len(names)
+    return pd.DataFrame({name: list(col) for name, col in zip(names, cols)})
 
 def _to_date_str(x: Any) -> Any:
     try:
@@ -30,27 +50,116 @@ def _to_date_str(x: Any) -> Any:
     except Exception:
         return x
 
+@st.cache_data(ttl=300, max_entries=32, show_spinner=False)
+def _encode_csv(df: pd.DataFrame) -> bytes:
+    """CSV mis en cache par contenu du DataFrame."""
+    return to_csv_bytes(df)
+
+@st.cache_data(ttl=300, max_entries=32, show_spinner=False)
+def _encode_json(df: pd.DataFrame) -> bytes:
+    """JSON (records) mis en cache par contenu du DataFrame."""
+    return df.to_json(orient="records").encode("utf-8")
+
+@st.cache_data(ttl=300, max_entries=32, show_spinner=False)
+def _encode_feather(df: pd.DataFrame) -> bytes:
+    """Feather (Arrow IPC, non compressé) mis en cache par contenu du DataFrame."""
+    import pyarrow as pa  # dépendance de streamlit; import local: chargé seulement au premier export Feather
+    import pyarrow.feather as pa_feather
+
+    # Colonnes objet potentiellement mixtes (ex: Q = 1..4 + "Total"): Arrow exige un type par colonne
+    obj_cols = df.select_dtypes(include="object").columns
+    if len(obj_cols):
+        df = df.astype({c: "string" for c in obj_cols})
+    buf = pa.BufferOutputStream()
+    pa_feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), buf, compression="uncompressed")
+    return buf.getvalue().to_pybytes()
+
+def lazy_download_button(container: Any, label: str, make_data: Callable[[], bytes], **kwargs: Any) -> None:
+    """
+    download_button dont les données ne sont produites qu'au clic (data callable, Streamlit récent).
+    Streamlit plus ancien (data callable refusée: "Invalid binary data format"): données calculées tout de suite.
+    """
+    try:
+        container.download_button(label, data=make_data, **kwargs)
+    except (StreamlitAPIException, RuntimeError) as e:
+        if "binary data format" not in str(e):
+            raise
+        container.download_button(label, data=make_data(), **kwargs)
+
+def _lazy_download(col: Any, label: str, encode: Any, df: pd.DataFrame, **kwargs: Any) -> None:
+    lazy_download_button(col, label, lambda: encode(df), **kwargs)
+
 def _download_row(df: pd.DataFrame, filename_prefix: str, key_prefix: str = "dl") -> None:
-    """Affiche deux boutons de téléchargement (CSV/JSON) avec encodages propres."""
+    """Boutons de téléchargement CSV/JSON/Feather."""
     if df is None or df.empty:
         return
-    csv = df.to_csv(index=False).encode("utf-8")
-    jsonb = df.to_json(orient="records").encode("utf-8")
-    c1, c2 = st.columns(2)
-    c1.download_button(
-        "⬇️ Télécharger CSV",
-        data=csv,
+    c1, c2, c3 = st.columns(3)
+    _lazy_download(
+        c1, "⬇️ Télécharger CSV", _encode_csv, df,
         file_name=f"{filename_prefix}.csv",
         mime="text/csv",
         key=f"{key_prefix}-csv",
     )
-    c2.download_button(
-        "⬇️ Télécharger JSON",
-        data=jsonb,
+    _lazy_download(
+        c2, "⬇️ Télécharger JSON", _encode_json, df,
         file_name=f"{filename_prefix}.json",
         mime="application/json",
         key=f"{key_prefix}-json",
     )
+    _lazy_download(
+        c3, "⬇️ Télécharger Feather", _encode_feather, df,
+        file_name=f"{filename_prefix}.feather",
+        mime="application/vnd.apache.arrow.file",
+        key=f"{key_prefix}-feather",
+    )
+
+# Colonnes source (dicts repo) -> libellés affichés
+_MATCH_COLUMNS: Dict[str, str] = {
+    "id": "ID",
+    "date": "Date",
+    "season_id": "Saison",
+    "home_club": "Domicile",
+    "away_club": "Extérieur",
+    "total_home_points": "Pts Dom",
+    "total_away_points": "Pts Ext",
+    "venue": "Lieu",
+}
+_MATCH_CATEGORY_COLS = ("Saison", "Domicile", "Extérieur", "Lieu")
+_QUARTER_FIELDS = ("home_goals", "home_behinds", "home_points", "away_goals", "away_behinds", "away_points")
+
+def _dates_to_iso(col: pd.Series, parsed: Optional[pd.Series] = None) -> pd.Series:
+    """Version vectorisée de _to_date_str: ISO si parsable, valeur d'origine sinon (parsed: dates déjà converties)."""
+    if parsed is None:
+        parsed = pd.to_datetime(col, errors="coerce")
+    return parsed.dt.strftime("%Y-%m-%d").where(parsed.notna(), col)
+
+def _int_cols(df: pd.DataFrame, cols: Iterable[str]) -> pd.DataFrame:
+    """Coercition unique en int32 (sérialisation Arrow directe par st.dataframe)."""
+    for c in cols:
+        df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0).astype("int32")
+    return df
+
+# Au-delà, seule une fenêtre de lignes est envoyée au navigateur (pagination)
+PAGE_ROWS = 500
+
+def _page_window(df: pd.DataFrame, key: str) -> pd.DataFrame:
+    """Fenêtre de PAGE_ROWS lignes (sélecteur de page) pour les grands tableaux; df inchangé sinon."""
+    if len(df) <= PAGE_ROWS:
+        return df
+    n_pages = -(-len(df) // PAGE_ROWS)
+    page = int(st.number_input(
+        f"Page (sur {n_pages})", min_value=1, max_value=n_pages, value=1, step=1, key=f"{key}-page",
+    ))
+    st.caption(f"Lignes {(page - 1) * PAGE_ROWS + 1}–{min(page * PAGE_ROWS, len(df))} sur {len(df)}")
+    return df.iloc[(page - 1) * PAGE_ROWS: page * PAGE_ROWS]
+
+def _frame_key(df: pd.DataFrame) -> str:
+    """Clé de widget stable dérivée des colonnes et du contenu (cellules non hachables: colonnes + taille)."""
+    try:
+        digest = int(pd.util.hash_pandas_object(df, index=False).sum()) & 0xFFFFFFFF
+    except TypeError:
+        digest = hash((tuple(map(str, df.columns)), len(df))) & 0xFFFFFFFF
+    return f"dataframe-{hash(tuple(map(str, df.columns))) & 0xFFFF:04x}-{digest:08x}"
 
 def show_dataframe(
     df: pd.DataFrame,
@@ -58,44 +167,81 @@ def show_dataframe(
     use_container_width: bool = True,
     key: Optional[str] = None,
 ) -> None:
+    """
+    st.dataframe paginé. `key` préfixe le sélecteur de page: à fournir si plusieurs tableaux partagent
+    la page; sans key, il est dérivé du contenu du DataFrame (deux tableaux différents -> clés différentes).
+    """
     if caption:
         st.caption(caption)
-    st.dataframe(df, use_container_width=use_container_width, hide_index=True, key=key)
+    view = _page_window(df, key or _frame_key(df))
+    st.dataframe(view, use_container_width=use_container_width, hide_index=True, key=key)
+
+def _show(df: pd.DataFrame, static: bool, index_col: str, key: str) -> None:
+    """Grille interactive (st.dataframe) ou tableau statique; st.table affiche l'index: on y place `index_col`."""
+    if static:
+        view = _page_window(df, key)
+        st.table(view.set_index(index_col) if index_col in view.columns else view)
+    else:
+        show_dataframe(df, key=key)
 
 
 # ------------------------------
 # Tableaux de matches
 # ------------------------------
 
+@st.cache_data(ttl=300, max_entries=32, show_spinner=False)
+def _matches_df_from_frame(rows: pd.DataFrame) -> pd.DataFrame:
+    """Chemin rapide (DataFrame aux colonnes du repo), mis en cache sur le contenu du DataFrame."""
+    df = rows.reindex(columns=list(_MATCH_COLUMNS)).rename(columns=_MATCH_COLUMNS).reset_index(drop=True)
+    return _finish_matches_df(df)
+
+@st.cache_data(ttl=300, max_entries=32, show_spinner=False)
+def _matches_df_from_rows(rows: Tuple[tuple, ...]) -> pd.DataFrame:
+    """Lignes déjà projetées en tuples primitifs (ordre de _MATCH_COLUMNS): hachage O(N) peu coûteux."""
+    df = _frame_from_tuples(rows, tuple(_MATCH_COLUMNS.values()))
+    return _finish_matches_df(df)
+
+def _finish_matches_df(df: pd.DataFrame) -> pd.DataFrame:
+    """Mise en forme commune aux deux chemins (DataFrame / tuples): mêmes dtypes quel que soit l'entrée."""
+    if df.empty:
+        return df
+    df = _int_cols(df, ("Pts Dom", "Pts Ext"))
+    # Colonnes texte très répétées (clubs, saisons, lieux): stockage dictionnaire (category)
+    for col in _MATCH_CATEGORY_COLS:
+        df[col] = df[col].astype("category")
+    # Dates parsées une seule fois: affichage ISO + tri du plus récent (datetime64, NaT en fin)
+    try:
+        parsed = pd.to_datetime(df["Date"], errors="coerce")
+    except Exception:
+        # Valeurs hétérogènes non convertibles en bloc: conversion ligne à ligne, ordre d'origine
+        df["Date"] = df["Date"].map(_to_date_str)
+        return df
+    df["Date"] = _dates_to_iso(df["Date"], parsed)
+    return df.loc[parsed.sort_values(ascending=False, kind="stable").index]
+
+
 def matches_table(
-    rows: Iterable[Any],
+    rows: Iterable[Any] | pd.DataFrame,
     title: Optional[str] = None,
     show_download: bool = False,
     key_prefix: str = "matches",
+    static: bool = False,
 ) -> pd.DataFrame:
-    data: List[Dict[str, Any]] = []
-    for m in rows or []:
-        data.append({
-            "ID": _get(m, "id"),
-            "Date": _to_date_str(_get(m, "date")),
-            "Saison": _get(m, "season_id"),
-            "Domicile": _get(m, "home_club"),
-            "Extérieur": _get(m, "away_club"),
-            "Pts Dom": _get(m, "total_home_points"),
-            "Pts Ext": _get(m, "total_away_points"),
-            "Lieu": _get(m, "venue"),
-        })
-    df = pd.DataFrame(data)
-    # tri du plus récent si possible
-    if not df.empty and "Date" in df.columns:
-        try:
-            df = df.sort_values("Date", ascending=False, key=lambda s: pd.to_datetime(s, errors="coerce"))
-        except Exception:
-            pass
+    """
+    Tableau récapitulatif des matchs.
+    `rows` peut être un DataFrame aux colonnes du repo (chemin rapide, vectorisé)
+    ou un itérable d'objets/dicts.
+    static=True: rendu HTML via st.table (pas de grille interactive), pour un récap en lecture seule.
+    """
+    # Construction mise en cache par contenu: un rerun sur les mêmes matchs ne reconstruit rien
+    if isinstance(rows, pd.DataFrame):
+        df = _matches_df_from_frame(rows)
+    else:
+        df = _matches_df_from_rows(tuple(_project(rows, tuple(_MATCH_COLUMNS))))
 
     if title:
         st.subheader(title)
-    show_dataframe(df)
+    _show(df, static, index_col="ID", key=f"{key_prefix}-matches-table")
 
     if show_download and not df.empty:
         _download_row(df, filename_prefix="matches", key_prefix=f"{key_prefix}-matches")
@@ -107,49 +253,45 @@ def matches_table(
 # Tableaux de quarts-temps
 # ------------------------------
 
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def _quarters_df(rows: Tuple[tuple, ...], home_label: str, away_label: str) -> pd.DataFrame:
+    """Quarts (tuples q, home_*, away_*) -> DataFrame libellé + ligne Total (sommes colonnaires)."""
+    names = (
+        "Q",
+        f"{home_label} G", f"{home_label} B", f"{home_label} P",
+        f"{away_label} G", f"{away_label} B", f"{away_label} P",
+    )
+    df = _frame_from_tuples(rows, names)
+    df = _int_cols(df, names[1:])
+    # Ajout en place (colonnes déjà définies, index 0..n-1): pas de copie via pd.concat
+    df.loc[len(df)] = ["Total", *(int(v) for v in df[list(names[1:])].sum())]
+    return df
+
+
 def quarters_table(
-    quarters: Iterable[Any],
+    quarters: Iterable[Any] | pd.DataFrame,
     home_label: str,
     away_label: str,
     title: str = "🧮 Détail par quart-temps",
     show_download: bool = True,
     key_prefix: str = "quarters",
+    static: bool = False,
 ) -> pd.DataFrame:
-    rows: List[Dict[str, Any]] = []
-    for q in quarters or []:
-        rows.append({
-            "Q": _get(q, "q"),
-            f"{home_label} G": _get(q, "home_goals", 0),
-            f"{home_label} B": _get(q, "home_behinds", 0),
-            f"{home_label} P": _get(q, "home_points", 0),
-            f"{away_label} G": _get(q, "away_goals", 0),
-            f"{away_label} B": _get(q, "away_behinds", 0),
-            f"{away_label} P": _get(q, "away_points", 0),
-        })
-
-    df = pd.DataFrame(rows)
-
-    # Ligne total si calcul possible
-    try:
-        sums = sum_quarters_match(list(quarters or []))
-        hg, hb, hp = sums["home"]
-        ag, ab, ap = sums["away"]
-        total_row = {
-            "Q": "Total",
-            f"{home_label} G": hg,
-            f"{home_label} B": hb,
-            f"{home_label} P": hp,
-            f"{away_label} G": ag,
-            f"{away_label} B": ab,
-            f"{away_label} P": ap,
-        }
-        df = pd.concat([df, pd.DataFrame([total_row])], ignore_index=True)
-    except Exception:
-        pass
+    """
+    Tableau des quarts-temps + ligne Total.
+    static=True: rendu HTML via st.table (lecture seule, pas d'encodage Arrow à chaque rerun).
+    """
+    # Lignes ramenées à des tuples primitifs (ordre "q" + _QUARTER_FIELDS) -> construction mise en cache
+    keys = ("q",) + _QUARTER_FIELDS
+    if isinstance(quarters, pd.DataFrame):
+        rows = tuple(quarters.reindex(columns=list(keys)).itertuples(index=False, name=None))
+    else:
+        rows = tuple(_project(quarters, keys))
+    df = _quarters_df(rows, home_label, away_label)
 
     if title:
         st.subheader(title)
-    show_dataframe(df)
+    _show(df, static, index_col="Q", key=f"{key_prefix}-quarters-table")
 
     if show_download and not df.empty:
         _download_row(df, filename_prefix="quarters", key_prefix=f"{key_prefix}-quarters")
@@ -167,28 +309,34 @@ def players_stats_table_view(
     show_total: bool = True,
     show_download: bool = False,
     key_prefix: str = "players",
+    static: bool = False,
 ) -> pd.DataFrame:
-    rows: List[Dict[str, Any]] = []
-    for ps in pstats or []:
-        rows.append({
-            "Joueur": _get(ps, "player_name"),
-            "Buts":   int(_get(ps, "goals", 0) or 0),
-            "Behinds":int(_get(ps, "behinds", 0) or 0),
-            "Points": int(_get(ps, "points", 0) or 0),
-        })
-
-    df = pd.DataFrame(rows)
+    """
+    Stats joueurs (+ ligne Total si show_total).
+    static=True: rendu HTML via st.table, comme pour quarters_table.
+    """
+    # Un seul from_records sur les tuples projetés, colonnes explicites (pas d'inférence de schéma par dict)
+    rows = _project(pstats, ("player_name", "goals", "behinds", "points"))
+    df = pd.DataFrame.from_records(rows, columns=["Joueur", "Buts", "Behinds", "Points"])
+    num = ["Buts", "Behinds", "Points"]
+    try:
+        # Cas courant (entiers du repo): cast direct en int32, sans to_numeric/fillna
+        df[num] = df[num].astype("int32")
+    except (TypeError, ValueError):
+        # None/NaN ou texte non numérique: coercition tolérante (-> 0)
+        df = _int_cols(df, num)
 
     if show_total and not df.empty:
-        total_row = {
+        # Colonnes déjà entières (int32, sans NaN via _int_cols): une seule réduction sur le bloc
+        tg, tb, tp = (int(v) for v in df[["Buts", "Behinds", "Points"]].to_numpy().sum(axis=0))
+        df.loc[len(df)] = {
             "Joueur": f"Total {team_label}",
-            "Buts":   int(df["Buts"].fillna(0).sum()),
-            "Behinds":int(df["Behinds"].fillna(0).sum()),
-            "Points": int(df["Points"].fillna(0).sum()),
+            "Buts":   tg,
+            "Behinds":tb,
+            "Points": tp,
         }
-        df = pd.concat([df, pd.DataFrame([total_row])], ignore_index=True)
 
-    show_dataframe(df)
+    _show(df, static, index_col="Joueur", key=f"{key_prefix}-players-table")
 
     if show_download and not df.empty:
         _download_row(df, filename_prefix="players", key_prefix=f"{key_prefix}-players")
@@ -200,24 +348,29 @@ def players_stats_table_view(
 # En-tête compact de match
 # ------------------------------
 
-def match_header(match: Any, show_scoreline: bool = True) -> None:
-    """
-    Affiche un en-tête résumant le match (Date – Home vs Away – score).
-    """
-    d = _get(match, "date")
-    saison = _get(match, "season_id")
-    home = _get(match, "home_club", "Home")
-    away = _get(match, "away_club", "Away")
-    venue = _get(match, "venue")
+# Champs lus une fois sur le match: clé du cache d'en-tête (valeurs primitives, pas l'objet ORM)
+_HEADER_FIELDS = (
+    "date", "season_id", "home_club", "away_club", "venue",
+    "total_home_points", "total_away_points",
+    "total_home_goals", "total_home_behinds", "total_away_goals", "total_away_behinds",
+)
+# Valeurs par défaut si l'attribut est absent (comme les _get d'origine)
+_HEADER_DEFAULTS = {"home_club": "Home", "away_club": "Away", "total_home_points": "?", "total_away_points": "?"}
+
+@lru_cache(maxsize=256)
+def _header_parts(values: tuple, show_scoreline: bool) -> Tuple[str, str, str]:
+    """(meta, left, right) de l'en-tête, mémorisé par valeurs affichées (reruns sur le même match)."""
+    view = SimpleNamespace(**dict(zip(_HEADER_FIELDS, values)))
+    d, saison, venue = view.date, view.season_id, view.venue
 
-    left = f"**{home}** vs **{away}**"
+    left = f"**{view.home_club}** vs **{view.away_club}**"
 
     if show_scoreline:
         try:
-            sh, sa = scoreline_home_away(match)
+            sh, sa = scoreline_home_away(view)
             right = f"{sh} – {sa}"
         except Exception:
-            right = f"({_get(match, 'total_home_points', '?')}) – ({_get(match, 'total_away_points', '?')})"
+            right = f"({view.total_home_points}) – ({view.total_away_points})"
     else:
         right = ""
 
@@ -228,7 +381,18 @@ def match_header(match: Any, show_scoreline: bool = True) -> None:
         meta_parts.append(f"Saison {saison}")
     if venue:
         meta_parts.append(str(venue))
-    meta = " · ".join(meta_parts)
+    return " · ".join(meta_parts), left, right
+
+def match_header(match: Any, show_scoreline: bool = True) -> None:
+    """
+    Affiche un en-tête résumant le match (Date – Home vs Away – score).
+    """
+    values = tuple(_get(match, f, _HEADER_DEFAULTS.get(f)) for f in _HEADER_FIELDS)
+    try:
+        meta, left, right = _header_parts(values, show_scoreline)
+    except TypeError:
+        # Valeur non hachable (objet exotique): calcul direct, sans cache
+        meta, left, right = _header_parts.__wrapped__(values, show_scoreline)
 
     if meta:
         st.caption(meta)
@@ -41,20 +41,31 @@ DEFAULT_NAMES = [
 
 
 def _dedupe_keep_order(names: List[str]) -> List[str]:
-    """Supprime les doublons tout en gardant l’ordre d’origine."""
-    seen = set()
-    out: List[str] = []
-    for n in names:
-        k = n.strip().lower()
-        if not k or k in seen:
-            continue
-        seen.add(k)
-        out.append(n.strip())
-    return out
+    """Supprime les doublons (insensible à la casse) tout en gardant l’ordre et la graphie de la 1re occurrence."""
+    norm = [s for s in map(str.strip, filter(None, names)) if s]
+    keys = list(map(str.lower, norm))
+    # Index de 1re occurrence par clé: les affectations en ordre inverse laissent le plus petit index
+    first = dict(zip(reversed(keys), range(len(keys) - 1, -1, -1)))
+    return [norm[first[k]] for k in dict.fromkeys(keys)]
 
 
 def _load_csv_names(path: str) -> List[str]:
     """Lit une liste de joueurs depuis un CSV (1 colonne, sans en-tête)."""
+    try:
+        # Parseur C++ de pyarrow (optionnel): seule la 1re colonne est lue, en texte brut
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+
+        tbl = pa_csv.read_csv(
+            path,
+            read_options=pa_csv.ReadOptions(autogenerate_column_names=True, encoding="utf-8"),
+            convert_options=pa_csv.ConvertOptions(column_types={"f0": pa.string()}, include_columns=["f0"]),
+        )
+        return _dedupe_keep_order(tbl.column(0).to_pylist())
+    except Exception:
+        # pyarrow absent ou fichier irrégulier (nb de colonnes variable…): module csv, plus tolérant
+        pass
+
     names: List[str] = []
     with open(path, newline="", encoding="utf-8") as f:
         rd = csv.reader(f)
@@ -90,11 +101,12 @@ def main(argv: list[str] | None = None) -> int:
         print("ℹ️ Aucun joueur à insérer.")
         return 0
 
-    # Suppression doublons et insertion idempotente
+    # Suppression doublons et insertion idempotente groupée
+    # (repo: 1 SELECT ... IN (...) sur l'existant + 1 INSERT multi-lignes pour les manquants)
     names = _dedupe_keep_order(names)
-    upsert_players(names, club=args.club)
+    inserted = upsert_players(names, user_ctx={"team_name": args.club, "is_admin": True})
 
-    print(f"✅ {len(names)} joueurs insérés (ou déjà présents) pour le club « {args.club} ».")
+    print(f"✅ {inserted} joueurs insérés ({len(names) - inserted} déjà présents) pour le club « {args.club} ».")
     return 0
 
 
@@ -0,0 +1,47 @@
+# tests/test_tables.py
+# -*- coding: utf-8 -*-
+import datetime
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import pandas as pd  # noqa: E402
+import pyarrow.feather as pa_feather  # noqa: E402
+
+from ui import tables  # noqa: E402
+
+
+class EncodeFeatherTest(unittest.TestCase):
+    def test_quarters_table_with_total_row(self):
+        rows = ((1, 2, 1, 13, 1, 0, 6), (2, 0, 3, 3, 2, 2, 14))
+        df = tables._quarters_df(rows, "Toulouse", "Lyon")
+        self.assertEqual(df["Q"].tolist(), [1, 2, "Total"])
+
+        data = tables._encode_feather(df)
+
+        back = pa_feather.read_table(io.BytesIO(data))
+        self.assertEqual(back.column("Q").to_pylist(), ["1", "2", "Total"])
+        self.assertEqual(back.column("Toulouse P").to_pylist(), [13, 3, 16])
+
+
+class MatchesFrameTest(unittest.TestCase):
+    def test_frame_and_rows_paths_agree(self):
+        rows = [
+            {"id": 1, "date": datetime.date(2024, 5, 1), "season_id": "2024", "home_club": "A", "away_club": "B",
+             "total_home_points": 50, "total_away_points": None, "venue": None},
+            {"id": 2, "date": "2024-06-01", "season_id": "2024", "home_club": "B", "away_club": "A",
+             "total_home_points": "12", "total_away_points": 30, "venue": "X"},
+        ]
+        from_rows = tables._matches_df_from_rows(tuple(tables._project(rows, tuple(tables._MATCH_COLUMNS))))
+        from_frame = tables._matches_df_from_frame(pd.DataFrame(rows))
+
+        pd.testing.assert_frame_equal(from_rows, from_frame)
+        self.assertEqual(str(from_rows["Pts Dom"].dtype), "int32")
+        self.assertEqual(from_rows["Date"].tolist(), ["2024-06-01", "2024-05-01"])
+
+
+if __name__ == "__main__":
+    unittest.main()